@@ -1,12 +1,14 @@
+import os
 from flask import Flask, redirect, url_for
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_migrate import Migrate
 from flask_wtf.csrf import CSRFProtect
 from config.config import config
+from app.services.read_replica import RoutingSession
 
-# Initialisation des extensions
-db = SQLAlchemy()
+# Initialisation des extensions (session capable d'envoyer les lectures vers un réplica)
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
 migrate = Migrate()
 csrf = CSRFProtect()
@@ -17,18 +19,39 @@ def create_app(config_name='default'):
     # Configuration
     app.config.from_object(config[config_name])
     
+    # Adresse réelle du client derrière les reverse proxies de confiance (limitation des connexions)
+    if app.config['TRUSTED_PROXY_COUNT']:
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        proxies = app.config['TRUSTED_PROXY_COUNT']
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxies, x_proto=proxies)
+    
+    # Pool de connexions instrumenté (statistiques d'attente sur /diagnostics/pool)
+    from app.services.db_pool import apply_pool_class, configure_sqlite
+    apply_pool_class(app)
+    
     # Initialisation des extensions avec l'application
     db.init_app(app)
     login_manager.init_app(app)
-    migrate.init_app(app, db)
+    # Migrations Alembic du dossier migrations/ (indépendant du répertoire courant ;
+    # mode batch pour les modifications de colonnes sous SQLite)
+    migrate.init_app(app, db, directory=os.path.join(os.path.dirname(app.root_path), 'migrations'),
+                     render_as_batch=True)
     csrf.init_app(app)
     
+    # Instrumentation optionnelle des requêtes (PROFILING_ENABLED, résultats sur /diagnostics/requests)
+    from app.services.profiling import request_profiler
+    request_profiler.init_app(app)
+    
+    # Métriques exposées sur /metrics (latence par blueprint, congés, PDF, pool de connexions)
+    from app.services.metrics import metrics
+    metrics.init_app(app)
+    
     # Configuration du login manager
     login_manager.login_view = 'auth.login'
     login_manager.login_message = 'Veuillez vous connecter pour accéder à cette page.'
     
     # Import des modèles pour que SQLAlchemy les connaisse
-    from app.models import user, employee, department, leave
+    from app.models import user, employee, department, leave, leave_ledger, report_job, login_throttle
     
     # Route racine
     @app.route('/')
@@ -36,16 +59,28 @@ def create_app(config_name='default'):
         return redirect(url_for('auth.login'))
     
     # Enregistrement des blueprints
-    from app.routes import auth, dashboard, employee, department, leave, profile
+    from app.routes import auth, dashboard, employee, department, leave, profile, export, diagnostics, metrics as metrics_routes
     app.register_blueprint(auth.bp)
     app.register_blueprint(dashboard.bp)
     app.register_blueprint(employee.bp)
     app.register_blueprint(department.bp)
     app.register_blueprint(leave.bp)
     app.register_blueprint(profile.bp)
+    app.register_blueprint(export.bp)
+    app.register_blueprint(diagnostics.bp)
+    app.register_blueprint(metrics_routes.bp)
+    
+    # Commandes CLI (flask ledger ..., flask reports cleanup, flask schema create)
+    from app.cli import register_commands
+    register_commands(app)
     
-    # Création des tables
+    # Le schéma est créé par "flask schema create" et migré par "flask db upgrade", pas à chaque
+    # démarrage, sauf pour l'exécutable SQLite qui n'a pas d'étape d'installation
     with app.app_context():
-        db.create_all()
+        for engine in db.engines.values():
+            configure_sqlite(engine, app)
+        if app.config['SCHEMA_AUTO_CREATE']:
+            from app.services.schema import upgrade_schema
+            upgrade_schema()
     
     return app
\ No newline at end of file
@@ -0,0 +1,77 @@
+import click
+from flask.cli import AppGroup
+
+ledger_cli = AppGroup('ledger', help='Gestion du cumul des congés (leave_ledger).')
+
+@ledger_cli.command('rebuild')
+def rebuild_ledger():
+    """Reconstruit le cumul des congés à partir de l'historique"""
+    from app.services.leave_balance import LeaveBalanceService
+    count = LeaveBalanceService().rebuild_ledger()
+    click.echo(f'Cumul reconstruit : {count} ligne(s).')
+
+@ledger_cli.command('verify')
+def verify_ledger():
+    """Vérifie que le cumul des congés correspond à l'historique"""
+    from app.services.leave_balance import LeaveBalanceService
+    mismatches = LeaveBalanceService().verify_ledger()
+    for (employee_id, year, leave_type), expected, stored in mismatches:
+        click.echo(f'Employé {employee_id} / {year} / {leave_type} : '
+                   f'attendu (pris, en attente) = {expected}, stocké = {stored}')
+    if mismatches:
+        raise click.ClickException(f'{len(mismatches)} écart(s) détecté(s). '
+                                   f'Lancez "flask ledger rebuild" pour corriger.')
+    click.echo('Cumul des congés cohérent avec l\'historique.')
+
+passwords_cli = AppGroup('passwords', help='Gestion des mots de passe des utilisateurs.')
+
+@passwords_cli.command('rehash')
+@click.option('--batch-size', default=200, show_default=True, help='Utilisateurs traités par transaction.')
+def rehash_passwords(batch_size):
+    """Remplace les mots de passe stockés en clair par leur empreinte (après "flask db upgrade")"""
+    from app import db
+    from app.models.user import User
+    from app.services.passwords import password_hasher
+
+    updated = 0
+    last_id = 0
+    while True:
+        users = User.query.filter(User.id > last_id).order_by(User.id).limit(batch_size).all()
+        if not users:
+            break
+        last_id = users[-1].id
+        plaintext = [user for user in users if user.password_hash and not password_hasher.is_hashed(user.password_hash)]
+        for user, password_hash in zip(plaintext, password_hasher.hash_many(user.password_hash for user in plaintext)):
+            user.password_hash = password_hash
+        db.session.commit()
+        updated += len(plaintext)
+    click.echo(f'Mots de passe ré-hachés : {updated}.')
+
+reports_cli = AppGroup('reports', help='Gestion des rapports générés en arrière-plan.')
+
+@reports_cli.command('cleanup')
+def cleanup_reports():
+    """Passe en échec les tâches interrompues et supprime les rapports expirés"""
+    from flask import current_app
+    from app.services.report_jobs import report_jobs
+    orphaned, purged = report_jobs.maintain(current_app)
+    click.echo(f'Tâches interrompues : {orphaned}. Rapports supprimés : {purged}.')
+
+schema_cli = AppGroup('schema', help='Gestion du schéma de la base de données.')
+
+@schema_cli.command('create')
+def create_schema():
+    """Crée les tables d'une base neuve (base existante : "flask db upgrade")"""
+    from sqlalchemy import inspect
+    from app import db
+    from app.services import schema
+    if inspect(db.engine).get_table_names():
+        raise click.ClickException('La base contient déjà des tables : utilisez "flask db upgrade".')
+    schema.create_schema()
+    click.echo('Tables créées.')
+
+def register_commands(app):
+    app.cli.add_command(ledger_cli)
+    app.cli.add_command(passwords_cli)
+    app.cli.add_command(reports_cli)
+    app.cli.add_command(schema_cli)
@@ -2,4 +2,7 @@ from app.models.user import User
 from app.models.department_manager import DepartmentManager
 from app.models.department import Department
 from app.models.employee import Employee
-from app.models.leave import Leave 
\ No newline at end of file
+from app.models.leave import Leave
+from app.models.leave_ledger import LeaveLedger 
+from app.models.report_job import ReportJob
+from app.models.login_throttle import LoginThrottleEntry
\ No newline at end of file
@@ -23,29 +23,8 @@ class Employee(db.Model):
     
     def calculate_leave_balance(self):
         """Calcule le solde de congés de l'employé"""
-        # Utiliser le solde personnalisé de l'employé
-        annual_leaves = self.annual_leave_days
-        
-        # Calculer les congés pris cette année
-        current_year = datetime.now().year
-        from app.models.leave import Leave
-        taken_leaves = Leave.query.filter(
-            Leave.employee_id == self.id,
-            Leave.status == 'approved',
-            db.func.extract('year', Leave.start_date) == current_year
-        ).all()
-        
-        total_taken = sum(
-            (leave.end_date - leave.start_date).days + 1 
-            for leave in taken_leaves
-        )
-        
-        balance = annual_leaves - total_taken
-        return {
-            'annual': annual_leaves,
-            'taken': total_taken,
-            'balance': max(0, balance)
-        }
+        from app.services.leave_balance import LeaveBalanceService
+        return LeaveBalanceService().calculate_balance(self)
     
     def calculate_seniority_years(self):
         """Calcule l'ancienneté en années"""
@@ -1,5 +1,6 @@
 from app import db
-from datetime import datetime
+from datetime import datetime, date
+from app.services.business_calendar import working_days
 
 class Leave(db.Model):
     __tablename__ = 'leaves'
@@ -11,8 +12,35 @@ class Leave(db.Model):
     leave_type = db.Column(db.String(20), nullable=False)  # vacation, sick, personal
     status = db.Column(db.String(20), default='pending')  # pending, approved, rejected
     reason = db.Column(db.Text)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Index composites pour les requêtes fréquentes (solde, congés en cours, tableau de bord, listes)
+    __table_args__ = (
+        db.Index('ix_leaves_employee_status_start', 'employee_id', 'status', 'start_date'),
+        db.Index('ix_leaves_status_start_end', 'status', 'start_date', 'end_date'),
+        # Pagination par curseur de la liste des congés
+        db.Index('ix_leaves_created_id', 'created_at', 'id'),
+        db.Index('ix_leaves_employee_created', 'employee_id', 'created_at'),
+        # Relecture incrémentale de l'index mémoire des congés
+        db.Index('ix_leaves_updated_at', 'updated_at'),
+    )
+    
+    @staticmethod
+    def year_bounds(year):
+        """Retourne l'intervalle [1er janvier, 1er janvier suivant[ d'une année"""
+        return date(year, 1, 1), date(year + 1, 1, 1)
+    
+    @classmethod
+    def starting_in_year(cls, year):
+        """Filtre sur l'année de début, utilisable par un index (pas d'EXTRACT)"""
+        year_start, next_year_start = cls.year_bounds(year)
+        return db.and_(cls.start_date >= year_start, cls.start_date < next_year_start)
+    
+    @property
+    def duration_days(self):
+        """Durée du congé en jours ouvrables (hors week-end et jours fériés), bornes incluses"""
+        return working_days(self.start_date, self.end_date)
+    
     def __repr__(self):
         return f'<Leave {self.employee_id} - {self.leave_type}>' 
\ No newline at end of file
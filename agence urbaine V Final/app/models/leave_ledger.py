@@ -0,0 +1,55 @@
+from sqlalchemy.exc import IntegrityError
+from app import db
+
+class LeaveLedger(db.Model):
+    """Cumul dénormalisé des jours de congés par employé, année et type"""
+    __tablename__ = 'leave_ledger'
+
+    employee_id = db.Column(db.Integer, db.ForeignKey('employees.id'), primary_key=True)
+    year = db.Column(db.Integer, primary_key=True)
+    leave_type = db.Column(db.String(20), primary_key=True)
+    days_taken = db.Column(db.Integer, nullable=False, default=0)
+    days_pending = db.Column(db.Integer, nullable=False, default=0)
+
+    # Colonne du cumul alimentée par chaque statut (les congés rejetés ne comptent pas)
+    STATUS_COLUMNS = {
+        'approved': 'days_taken',
+        'pending': 'days_pending'
+    }
+
+    @classmethod
+    def get_or_create(cls, employee_id, year, leave_type):
+        key = (employee_id, year, leave_type)
+        entry = db.session.get(cls, key)
+        if entry is None:
+            entry = cls(employee_id=employee_id, year=year, leave_type=leave_type,
+                        days_taken=0, days_pending=0)
+            try:
+                with db.session.begin_nested():
+                    db.session.add(entry)
+            except IntegrityError:
+                # Ligne créée entre-temps par une transaction concurrente : on la relit
+                entry = db.session.get(cls, key, populate_existing=True)
+        return entry
+
+    @classmethod
+    def record(cls, leave, previous_status=None):
+        """Reporte dans le cumul le passage d'un congé de previous_status à leave.status
+
+        Doit être appelé dans la même transaction que la modification du congé.
+        """
+        old_column = cls.STATUS_COLUMNS.get(previous_status)
+        new_column = cls.STATUS_COLUMNS.get(leave.status)
+        if old_column == new_column:
+            return
+
+        entry = cls.get_or_create(leave.employee_id, leave.start_date.year, leave.leave_type)
+        days = leave.duration_days
+        # Mise à jour relative (col = col + n) pour rester correcte en cas d'accès concurrents
+        if old_column:
+            setattr(entry, old_column, getattr(cls, old_column) - days)
+        if new_column:
+            setattr(entry, new_column, getattr(cls, new_column) + days)
+
+    def __repr__(self):
+        return f'<LeaveLedger {self.employee_id} {self.year} {self.leave_type}>'
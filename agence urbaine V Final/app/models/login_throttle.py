@@ -0,0 +1,13 @@
+from app import db
+
+class LoginThrottleEntry(db.Model):
+    """Compteurs d'échecs de connexion partagés entre workers (fenêtre glissante approchée)"""
+    __tablename__ = 'login_throttle'
+
+    key = db.Column(db.String(190), primary_key=True)  # "ip:..." ou "email:..."
+    window_start = db.Column(db.Integer, nullable=False)  # numéro de la fenêtre courante
+    previous_count = db.Column(db.Integer, nullable=False, default=0)
+    current_count = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<LoginThrottleEntry {self.key}>'
@@ -0,0 +1,45 @@
+from app import db
+from datetime import datetime
+import json
+
+class ReportJob(db.Model):
+    """Génération de rapport exécutée en arrière-plan"""
+    __tablename__ = 'report_jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)  # all_employees_pdf, employee_pdfs_zip
+    params = db.Column(db.Text)  # paramètres du rapport (JSON)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, running, done, failed
+    progress = db.Column(db.Integer, nullable=False, default=0)  # pourcentage
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    host = db.Column(db.String(255))  # machine et processus qui exécutent la tâche
+    pid = db.Column(db.Integer)
+    file_path = db.Column(db.String(255))
+    filename = db.Column(db.String(255))
+    error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    @property
+    def parameters(self):
+        return json.loads(self.params) if self.params else {}
+
+    @property
+    def is_finished(self):
+        return self.status in ('done', 'failed')
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'params': self.parameters,
+            'status': self.status,
+            'progress': self.progress,
+            'filename': self.filename,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+    def __repr__(self):
+        return f'<ReportJob {self.id} {self.kind} {self.status}>'
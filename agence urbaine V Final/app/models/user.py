@@ -1,6 +1,7 @@
-from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
+from sqlalchemy import inspect
 from app import db, login_manager
+from app.services.passwords import password_hasher
 
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
@@ -8,7 +9,7 @@ class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(120), unique=True, nullable=False)
     username = db.Column(db.String(80), unique=True, nullable=False)
-    password_hash = db.Column(db.String(128))
+    password_hash = db.Column(db.String(255))
     role = db.Column(db.String(20), nullable=False, default='employee')
     is_active = db.Column(db.Boolean, default=True)
     
@@ -16,11 +17,19 @@ class User(UserMixin, db.Model):
     employee = db.relationship('Employee', backref='user', uselist=False)
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
         
     def check_password(self, password):
-        # Comparaison directe pour les mots de passe en clair
-        return self.password_hash == password
+        # Les mots de passe encore en clair ou aux anciens paramètres sont
+        # ré-hachés au passage (l'appelant valide la session), sauf si la
+        # colonne n'a pas encore été élargie (migration 0005)
+        valid, needs_rehash = password_hasher.verify(self.password_hash, password)
+        if needs_rehash:
+            password_hash = password_hasher.hash(password)
+            capacity = password_hash_capacity()
+            if capacity is None or len(password_hash) <= capacity:
+                self.password_hash = password_hash
+        return valid
     
     @property
     def is_admin(self):
@@ -33,6 +42,26 @@ class User(UserMixin, db.Model):
     def __repr__(self):
         return f'<User {self.username}>'
 
+_password_hash_capacities = {}
+
+def password_hash_capacity():
+    """Longueur de users.password_hash dans la base (None si non contrôlée, SQLite)
+
+    Lue une fois par processus : tant que la migration 0005 n'est pas
+    appliquée, la colonne peut être plus étroite que dans le modèle.
+    """
+    engine = db.engine
+    if engine.dialect.name == 'sqlite':
+        return None
+    key = str(engine.url)
+    if key not in _password_hash_capacities:
+        columns = inspect(engine).get_columns(User.__tablename__)
+        _password_hash_capacities[key] = next((getattr(column['type'], 'length', None)
+                                               for column in columns if column['name'] == 'password_hash'), None)
+    return _password_hash_capacities[key]
+
 @login_manager.user_loader
 def load_user(id):
-    return User.query.get(int(id)) 
\ No newline at end of file
+    # Utilisateur, employé et département en une requête (ou identité en cache de session)
+    from app.services.identity import identity_cache
+    return identity_cache.load(int(id)) 
\ No newline at end of file
@@ -2,6 +2,8 @@ from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_user, logout_user, login_required, current_user
 from urllib.parse import urlparse
 from app.models.user import User
+from app.services.passwords import PasswordVerificationBusy
+from app.services.login_throttle import login_throttle
 from app import db
 from flask_wtf import FlaskForm
 from wtforms import StringField, PasswordField, BooleanField, SubmitField
@@ -22,11 +24,28 @@ def login():
     
     form = LoginForm()
     if form.validate_on_submit():
+        # Trop d'échecs récents pour cette IP ou cet email : refus sans requête ni hachage
+        retry_after = login_throttle.retry_after(request.remote_addr, form.email.data)
+        if retry_after:
+            form.password.errors.append(f'Trop de tentatives, veuillez réessayer dans {retry_after} secondes')
+            return render_template('auth/login.html', title='Connexion', form=form), 429, {'Retry-After': str(retry_after)}
+        
         user = User.query.filter_by(email=form.email.data).first()
-        if user is None or not user.check_password(form.password.data):
+        try:
+            valid = user is not None and user.check_password(form.password.data)
+        except PasswordVerificationBusy as e:
+            # Afflux de connexions : ne pas bloquer le worker plus longtemps
+            form.password.errors.append(str(e))
+            return render_template('auth/login.html', title='Connexion', form=form), 503
+        if not valid:
+            login_throttle.register_failure(request.remote_addr, form.email.data)
             # flash('Email ou mot de passe invalide', 'error')  # Masqué pour environnement professionnel
             return redirect(url_for('auth.login'))
         
+        login_throttle.register_success(request.remote_addr, form.email.data)
+        
+        # Enregistre l'empreinte recalculée (mot de passe en clair ou anciens paramètres)
+        db.session.commit()
         login_user(user, remember=form.remember_me.data)
         next_page = request.args.get('next')
         if not next_page or urlparse(next_page).netloc != '':
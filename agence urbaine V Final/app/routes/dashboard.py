@@ -1,93 +1,134 @@
-from flask import Blueprint, render_template
+from flask import Blueprint, render_template, current_app
 from flask_login import login_required, current_user
 from app.models.employee import Employee
 from app.models.department import Department
 from app.models.leave import Leave
-from sqlalchemy import desc, func
+from app.services.cache import TTLCache, invalidate_on_commit
+from app.services.read_replica import use_replica
+from app import db
+from sqlalchemy import desc, func, case, and_
+from sqlalchemy.orm import joinedload
 from datetime import datetime, timedelta, date
 import json
+import logging
+
+logger = logging.getLogger(__name__)
 
 bp = Blueprint('dashboard', __name__, url_prefix='/dashboard')
 
+# Cache du tableau de bord, vidé dès qu'un employé, un département ou un congé change
+dashboard_cache = TTLCache()
+invalidate_on_commit(dashboard_cache, Employee, Department, Leave)
+
+def build_dashboard_data():
+    """Calcule l'ensemble des données du tableau de bord (valeurs simples, sans objets ORM)"""
+    today = date.today()
+    is_current = and_(
+        Leave.start_date <= today,
+        Leave.end_date >= today,
+        Leave.status == 'approved'
+    )
+    
+    # Statistiques de base en une seule requête (agrégats conditionnels)
+    total_employees, total_departments, active_leaves, pending_leaves = db.session.query(
+        db.session.query(func.count(Employee.id)).scalar_subquery(),
+        db.session.query(func.count(Department.id)).scalar_subquery(),
+        func.coalesce(func.sum(case((is_current, 1), else_=0)), 0),
+        func.coalesce(func.sum(case((Leave.status == 'pending', 1), else_=0)), 0)
+    ).select_from(Leave).one()
+    stats = {
+        'total_employees': int(total_employees or 0),
+        'total_departments': int(total_departments or 0),
+        'active_leaves': int(active_leaves or 0),
+        'pending_leaves': int(pending_leaves or 0),
+        'attendance_rate': 95  # Valeur par défaut
+    }
+    
+    # Données pour le graphique : effectif à chaque date en une seule requête
+    last_12_months = []
+    comparison_dates = []
+    current_date = datetime.now()
+    
+    for i in range(12):
+        date_point = current_date - timedelta(days=30*i)
+        last_12_months.append(date_point.strftime('%B %Y'))
+        comparison_dates.append(date_point.date())
+    
+    headcounts = db.session.query(*[
+        func.coalesce(func.sum(case((Employee.hire_date <= comparison_date, 1), else_=0)), 0)
+        for comparison_date in comparison_dates
+    ]).one()
+    values = [int(count or 0) for count in headcounts]
+    
+    last_12_months.reverse()
+    values.reverse()
+    
+    chart_data = {
+        'labels': json.dumps(last_12_months),
+        'values': json.dumps(values)
+    }
+    
+    # Derniers employés ajoutés
+    recent_employees = Employee.query.options(joinedload(Employee.department))\
+                                     .order_by(desc(Employee.hire_date)).limit(5).all()
+    
+    # Personnes actuellement en congé
+    current_leaves = Leave.query.options(joinedload(Leave.employee))\
+                                .filter(is_current)\
+                                .order_by(Leave.start_date).limit(5).all()
+    
+    # Prochains congés
+    upcoming_leaves = Leave.query.options(joinedload(Leave.employee)).filter(
+        Leave.start_date > today,
+        Leave.status == 'approved'
+    ).order_by(Leave.start_date).limit(5).all()
+    
+    return {
+        'stats': stats,
+        'chart_data': chart_data,
+        'recent_employees': [_employee_snapshot(employee) for employee in recent_employees],
+        'current_leaves': [_leave_snapshot(leave) for leave in current_leaves],
+        'upcoming_leaves': [_leave_snapshot(leave) for leave in upcoming_leaves]
+    }
+
+def _employee_snapshot(employee):
+    return {
+        'id': employee.id,
+        'first_name': employee.first_name,
+        'last_name': employee.last_name,
+        'hire_date': employee.hire_date,
+        'department': {'name': employee.department.name} if employee.department else None
+    }
+
+def _leave_snapshot(leave):
+    return {
+        'id': leave.id,
+        'start_date': leave.start_date,
+        'end_date': leave.end_date,
+        'duration_days': leave.duration_days,
+        'leave_type': leave.leave_type,
+        'employee': {
+            'first_name': leave.employee.first_name,
+            'last_name': leave.employee.last_name
+        }
+    }
+
 @bp.route('/')
 @login_required
+@use_replica
 def index():
     try:
-        # Statistiques de base avec gestion des erreurs
-        today = date.today()
-        stats = {
-            'total_employees': Employee.query.count() or 0,  # Retourne 0 si None
-            'total_departments': Department.query.count() or 0,
-            'active_leaves': Leave.query.filter(
-                Leave.start_date <= today,
-                Leave.end_date >= today,
-                Leave.status == 'approved'
-            ).count() or 0,
-            'pending_leaves': Leave.query.filter_by(status='pending').count() or 0,
-            'attendance_rate': 95  # Valeur par défaut
-        }
-        
-        # Données pour le graphique
-        last_12_months = []
-        values = []
-        current_date = datetime.now()
-        
-        for i in range(12):
-            date_point = current_date - timedelta(days=30*i)
-            last_12_months.append(date_point.strftime('%B %Y'))
-            comparison_date = date_point.date()
-            try:
-                count = Employee.query.filter(
-                    Employee.hire_date <= comparison_date
-                ).count() or 0
-            except Exception:
-                count = 0
-            values.append(int(count))
-        
-        last_12_months.reverse()
-        values.reverse()
-        
-        chart_data = {
-            'labels': json.dumps(last_12_months),
-            'values': json.dumps(values)
-        }
-        
-        # Derniers employés ajoutés
-        try:
-            recent_employees = Employee.query.order_by(desc(Employee.hire_date)).limit(5).all()
-        except Exception:
-            recent_employees = []
-        
-        # Personnes actuellement en congé
-        today = date.today()
-        try:
-            current_leaves = Leave.query.filter(
-                Leave.start_date <= today,
-                Leave.end_date >= today,
-                Leave.status == 'approved'
-            ).order_by(Leave.start_date).all()
-        except Exception:
-            current_leaves = []
-        
-        # Prochains congés
-        try:
-            upcoming_leaves = Leave.query.filter(
-                Leave.start_date > today,
-                Leave.status == 'approved'
-            ).order_by(Leave.start_date).limit(5).all()
-        except Exception:
-            upcoming_leaves = []
+        # Données mises en cache par processus, invalidées à chaque modification
+        ttl = current_app.config.get('DASHBOARD_CACHE_TTL', 30)
+        data = dashboard_cache.get_or_set(('dashboard', date.today()), build_dashboard_data, ttl)
         
         return render_template('dashboard/index.html', 
                              title='Tableau de bord',
-                             stats=stats,
-                             chart_data=chart_data,
-                             recent_employees=recent_employees,
-                             current_leaves=current_leaves,
-                             upcoming_leaves=upcoming_leaves)
+                             **data)
                              
-    except Exception as e:
-        # En cas d'erreur, retourner des valeurs par défaut
+    except Exception:
+        # En cas d'erreur, retourner des valeurs par défaut (l'erreur est journalisée)
+        logger.exception("Erreur lors du chargement du tableau de bord")
         default_stats = {
             'total_employees': 0,
             'total_departments': 0,
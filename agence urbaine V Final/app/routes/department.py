@@ -3,6 +3,9 @@ from flask_login import login_required, current_user
 from app.models.department import Department
 from app.models.employee import Employee
 from app import db
+from app.services.read_replica import use_replica
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload, selectinload
 from flask_wtf import FlaskForm
 from wtforms import StringField, TextAreaField, SelectField
 from wtforms.validators import DataRequired, ValidationError
@@ -23,11 +26,18 @@ class DepartmentForm(FlaskForm):
 
 @bp.route('/')
 @login_required
+@use_replica
 def index():
-    departments = Department.query.all()
+    departments = Department.query.options(joinedload(Department.manager)).all()
+    # Effectifs calculés par une requête groupée plutôt qu'en chargeant chaque collection
+    employee_counts = dict(
+        db.session.query(Employee.department_id, func.count(Employee.id))
+                  .group_by(Employee.department_id).all()
+    )
     return render_template('departments/list.html',
                          title='Départements',
-                         departments=departments)
+                         departments=departments,
+                         employee_counts=employee_counts)
 
 @bp.route('/add', methods=['GET', 'POST'])
 @login_required
@@ -54,7 +64,10 @@ def add():
 @bp.route('/<int:id>')
 @login_required
 def view(id):
-    department = Department.query.get_or_404(id)
+    department = Department.query.options(
+        joinedload(Department.manager),
+        selectinload(Department.employees)
+    ).filter_by(id=id).first_or_404()
     return render_template('departments/view.html',
                          title=f'Département {department.name}',
                          department=department)
@@ -0,0 +1,42 @@
+from flask import Blueprint, jsonify, request, render_template, redirect, url_for, current_app
+from flask_login import login_required, current_user
+from app import db
+from app.services.db_pool import pool_status
+from app.services.profiling import request_profiler
+
+bp = Blueprint('diagnostics', __name__, url_prefix='/diagnostics')
+
+@bp.route('/pool')
+@login_required
+def pool():
+    """État des pools de connexions (JSON), réservé aux administrateurs"""
+    if not current_user.is_admin:
+        return jsonify({'error': 'Accès refusé'}), 403
+    
+    return jsonify({
+        (bind or 'default'): pool_status(engine)
+        for bind, engine in db.engines.items()
+    })
+
+@bp.route('/requests')
+@login_required
+def requests():
+    """Endpoints les plus lents parmi les requêtes échantillonnées de ce processus"""
+    if not current_user.is_admin:
+        if request.args.get('format') == 'json':
+            return jsonify({'error': 'Accès refusé'}), 403
+        return redirect(url_for('dashboard.index'))
+    
+    endpoints = request_profiler.slowest_endpoints(limit=request.args.get('limit', 20, type=int))
+    if request.args.get('format') == 'json':
+        return jsonify({
+            'enabled': current_app.config['PROFILING_ENABLED'],
+            'sample_rate': current_app.config['PROFILING_SAMPLE_RATE'],
+            'endpoints': endpoints
+        })
+    
+    return render_template('diagnostics/requests.html',
+                         title='Performances des requêtes',
+                         endpoints=endpoints,
+                         enabled=current_app.config['PROFILING_ENABLED'],
+                         sample_rate=current_app.config['PROFILING_SAMPLE_RATE'])
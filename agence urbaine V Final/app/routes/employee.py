@@ -1,15 +1,31 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, send_file
+from flask import Blueprint, render_template, redirect, url_for, flash, request, send_file, current_app, Response, jsonify
 from flask_login import login_required, current_user
 from app.models.employee import Employee
 from app.models.department import Department
 from app.models.department_manager import DepartmentManager
 from app.models.user import User
+from app.models.report_job import ReportJob
 from app import db
 from flask_wtf import FlaskForm
+from flask_wtf.file import FileField, FileRequired, FileAllowed
 from wtforms import StringField, SelectField, DateField, EmailField, PasswordField, IntegerField
 from wtforms.validators import DataRequired, Email, ValidationError, Length, EqualTo
+import logging
+import os
 from datetime import datetime
-from app.services.pdf_export import PDFExportService
+from tempfile import SpooledTemporaryFile
+from sqlalchemy.orm import joinedload
+from app.services.report_jobs import report_jobs
+from app.services.pdf_cache import get_pdf_cache
+from app.services.leave_index import leave_index
+from app.services.identity import identity_cache
+from app.services.leave_calendar import leave_calendar
+from app.services.read_replica import use_replica
+from app.services.metrics import pdf_render_duration, pdf_cache_requests
+from app.routes.dashboard import dashboard_cache
+from app.services.employee_import import EmployeeImportService, EmployeeImportError, COLUMNS as IMPORT_COLUMNS
+
+logger = logging.getLogger(__name__)
 
 bp = Blueprint('employee', __name__, url_prefix='/employees')
 
@@ -30,8 +46,12 @@ class EmployeeForm(FlaskForm):
 
     def __init__(self, *args, **kwargs):
         self.is_edit = kwargs.pop('is_edit', False)
+        # Choix des départements déjà chargés (import en masse), sinon lus en base
+        department_choices = kwargs.pop('department_choices', None)
         super(EmployeeForm, self).__init__(*args, **kwargs)
-        self.department_id.choices = [(d.id, d.name) for d in Department.query.all()]
+        if department_choices is None:
+            department_choices = [(d.id, d.name) for d in Department.query.all()]
+        self.department_id.choices = department_choices
     
     def validate_password(self, field):
         # Le mot de passe est requis seulement si c'est un nouvel employé
@@ -47,11 +67,21 @@ class EmployeeForm(FlaskForm):
         if self.password.data and not field.data:
             raise ValidationError('Veuillez confirmer le mot de passe')
 
+class EmployeeImportForm(FlaskForm):
+    file = FileField('Fichier CSV ou XLSX', validators=[
+        FileRequired('Veuillez choisir un fichier'),
+        FileAllowed(['csv', 'xlsx'], 'Seuls les fichiers CSV et XLSX sont acceptés')
+    ])
+
 @bp.route('/')
 @login_required
+@use_replica
 def index():
     page = request.args.get('page', 1, type=int)
-    employees = Employee.query.paginate(page=page, per_page=10)
+    employees = Employee.query.options(
+        joinedload(Employee.user),
+        joinedload(Employee.department)
+    ).paginate(page=page, per_page=10)
     departments = Department.query.all()
     return render_template('employees/list.html', 
                          title='Liste des Employés',
@@ -79,7 +109,7 @@ def add():
             username=username,
             role=form.role.data  # Utiliser le rôle choisi dans le formulaire
         )
-        user.password_hash = form.password.data  # Mot de passe en clair
+        user.set_password(form.password.data)
         db.session.add(user)
         db.session.flush()  # Pour obtenir l'ID de l'utilisateur
 
@@ -107,6 +137,33 @@ def add():
                          title='Ajouter un Employé',
                          form=form)
 
+@bp.route('/import', methods=['GET', 'POST'])
+@login_required
+def import_employees():
+    """Import en masse d'employés depuis un fichier CSV ou XLSX"""
+    if current_user.role not in ['admin', 'manager']:
+        # flash('Vous n\'avez pas les permissions pour importer des employés', 'error')  # Masqué pour environnement professionnel
+        return redirect(url_for('employee.index'))
+    
+    form = EmployeeImportForm()
+    result = None
+    if form.validate_on_submit():
+        upload = form.file.data
+        try:
+            result = EmployeeImportService(EmployeeForm).import_file(upload.stream, upload.filename)
+        except EmployeeImportError as e:
+            form.file.errors.append(str(e))
+        finally:
+            # Les insertions en masse ne passent pas par les événements de session
+            dashboard_cache.invalidate()
+            leave_calendar.cache.invalidate()
+    
+    return render_template('employees/import.html',
+                         title='Importer des employés',
+                         form=form,
+                         result=result,
+                         columns=IMPORT_COLUMNS)
+
 @bp.route('/<int:id>')
 @login_required
 def view(id):
@@ -152,12 +209,13 @@ def edit(id):
         
         # Mise à jour du mot de passe si fourni
         if form.password.data:
-            employee.user.password_hash = form.password.data  # Mot de passe en clair
+            employee.user.set_password(form.password.data)
             # flash(f'Employé modifié avec succès. Nouveau mot de passe : {form.password.data}', 'success')  # Masqué pour environnement professionnel
         # else:
         #     flash('Employé modifié avec succès', 'success')  # Masqué pour environnement professionnel
         
         db.session.commit()
+        identity_cache.invalidate(employee.user.id)
         return redirect(url_for('employee.view', id=employee.id))
     
     # Pré-remplir le formulaire avec les données actuelles
@@ -171,58 +229,59 @@ def edit(id):
 @bp.route('/<int:id>/delete', methods=['POST'])
 @login_required
 def delete(id):
-    print(f"Tentative de suppression de l'employé ID: {id}")
     employee = Employee.query.get_or_404(id)
-    print(f"Employé trouvé: {employee.first_name} {employee.last_name}")
+    logger.info("Suppression demandée de l'employé %s (%s %s) par l'utilisateur %s",
+                id, employee.first_name, employee.last_name, current_user.id)
     
     # Empêcher la suppression de l'administrateur principal
     if employee.user.role == 'admin' and employee.user.email == 'admin@agence-urbaine.com':
-        print("Tentative de suppression de l'admin principal - bloquée")
+        logger.warning("Suppression de l'administrateur principal refusée (utilisateur %s)", current_user.id)
         flash('Impossible de supprimer l\'administrateur principal du système.', 'error')
         return redirect(url_for('employee.index'))
     
     # Vérifier s'il y a des congés associés (pour information seulement)
     leaves_count = len(employee.leaves) if employee.leaves else 0
-    print(f"Nombre de congés associés: {leaves_count}")
+    logger.debug("Employé %s : %s congé(s) associé(s), manager : %s", id, leaves_count, employee.is_manager)
     
     # Vérifier s'il est manager d'un département
-    print(f"Est manager: {employee.is_manager}")
     if employee.is_manager:
         managed_departments = DepartmentManager.query.filter_by(employee_id=employee.id).all()
-        print(f"Nombre de départements gérés: {len(managed_departments)}")
+        logger.debug("Employé %s : %s département(s) géré(s)", id, len(managed_departments))
         if managed_departments:
             # Vérifier si l'utilisateur actuel est admin ou manager (directeur)
             current_user_role = current_user.role
-            print(f"Rôle de l'utilisateur actuel: {current_user_role}")
             if current_user_role not in ['admin', 'manager']:
-                print("Employé est manager - suppression bloquée pour utilisateur non autorisé")
+                logger.warning("Suppression du manager %s refusée pour le rôle %s", id, current_user_role)
                 flash(f'Impossible de supprimer l\'employé "{employee.first_name} {employee.last_name}" car il est manager d\'un département. Seuls les administrateurs et directeurs peuvent supprimer des managers.', 'error')
                 return redirect(url_for('employee.index'))
-            else:
-                print("Suppression autorisée - utilisateur est admin ou manager")
     
     try:
-        print("Début de la suppression...")
         employee_name = f"{employee.first_name} {employee.last_name}"
         
         # Supprimer d'abord les congés associés
         from app.models.leave import Leave
         deleted_leaves = Leave.query.filter_by(employee_id=employee.id).delete()
-        print(f"Congés supprimés: {deleted_leaves}")
+        
+        # Supprimer le cumul de congés de l'employé
+        from app.models.leave_ledger import LeaveLedger
+        LeaveLedger.query.filter_by(employee_id=employee.id).delete()
         
         # Supprimer les relations de management de département
         deleted_managers = DepartmentManager.query.filter_by(employee_id=employee.id).delete()
-        print(f"Relations de management supprimées: {deleted_managers}")
         
         # Supprimer l'employé et l'utilisateur associé
         user = employee.user
+        user_id = user.id
         db.session.delete(employee)
         db.session.delete(user)
         db.session.commit()
-        print(f"Suppression réussie pour: {employee_name}")
+        leave_index.remove_employee(id)
+        identity_cache.invalidate(user_id)
+        logger.info("Employé %s (%s) supprimé : %s congé(s), %s relation(s) de management",
+                    id, employee_name, deleted_leaves, deleted_managers)
         # flash(f'Employé "{employee_name}" supprimé avec succès', 'success')  # Masqué pour environnement professionnel
     except Exception as e:
-        print(f"Erreur lors de la suppression: {str(e)}")
+        logger.exception("Erreur lors de la suppression de l'employé %s", id)
         db.session.rollback()
         flash(f'Erreur lors de la suppression de l\'employé: {str(e)}', 'error')
     
@@ -238,17 +297,33 @@ def export_employee_pdf(id):
         return redirect(url_for('employee.index'))
     
     try:
-        pdf_service = PDFExportService()
-        pdf_buffer = pdf_service.generate_employee_pdf(id)
-        
+        # ReportLab n'est chargé qu'au premier export, pas au démarrage des workers
+        from app.services.pdf_export import pdf_export_service
         employee = Employee.query.get_or_404(id)
+        
+        # Le rapport n'est régénéré que si l'employé ou ses congés ont changé
+        fingerprint = pdf_export_service.employee_report_fingerprint(employee)
+        if fingerprint in request.if_none_match:
+            response = Response(status=304)
+            response.set_etag(fingerprint)
+            return response
+        
+        pdf_cache = get_pdf_cache(current_app)
+        pdf_path = pdf_cache.get(fingerprint)
+        pdf_cache_requests.inc(result='hit' if pdf_path else 'miss')
+        if pdf_path is None:
+            with pdf_render_duration.time(report='employee'):
+                pdf_buffer = pdf_export_service.generate_employee_pdf(id)
+            pdf_path = pdf_cache.put(fingerprint, pdf_buffer.getvalue())
+        
         filename = f"rapport_{employee.first_name}_{employee.last_name}_{datetime.now().strftime('%Y%m%d')}.pdf"
         
         return send_file(
-            pdf_buffer,
+            pdf_path,
             as_attachment=True,
             download_name=filename,
-            mimetype='application/pdf'
+            mimetype='application/pdf',
+            etag=fingerprint
         )
     except Exception as e:
         # flash(f'Erreur lors de la génération du PDF: {str(e)}', 'error')  # Masqué pour environnement professionnel
@@ -264,17 +339,87 @@ def export_all_employees_pdf():
         return redirect(url_for('employee.index'))
     
     try:
-        pdf_service = PDFExportService()
-        pdf_buffer = pdf_service.generate_all_employees_pdf()
+        # Le PDF est écrit dans un fichier temporaire (en mémoire tant qu'il est petit)
+        # puis renvoyé par morceaux
+        from app.services.pdf_export import pdf_export_service
+        pdf_file = SpooledTemporaryFile(max_size=current_app.config['PDF_SPOOL_MAX_SIZE'])
+        with pdf_render_duration.time(report='all_employees'):
+            pdf_export_service.generate_all_employees_pdf(output=pdf_file)
         
         filename = f"rapport_tous_employes_{datetime.now().strftime('%Y%m%d')}.pdf"
         
-        return send_file(
-            pdf_buffer,
-            as_attachment=True,
-            download_name=filename,
-            mimetype='application/pdf'
+        return Response(
+            stream_file(pdf_file),
+            mimetype='application/pdf',
+            headers={'Content-Disposition': f'attachment; filename="{filename}"'}
         )
     except Exception as e:
         # flash(f'Erreur lors de la génération du PDF: {str(e)}', 'error')  # Masqué pour environnement professionnel
-        return redirect(url_for('employee.index'))
\ No newline at end of file
+        return redirect(url_for('employee.index'))
+
+@bp.route('/export-all-pdf/jobs', methods=['POST'])
+@login_required
+def enqueue_all_employees_pdf():
+    """Lance la génération du rapport global en arrière-plan"""
+    if current_user.role not in ['admin', 'manager']:
+        return jsonify({'error': 'Accès refusé'}), 403
+    
+    job = report_jobs.enqueue('all_employees_pdf', current_user.id)
+    return jsonify({
+        **job.to_dict(),
+        'status_url': url_for('employee.report_job_status', job_id=job.id),
+        'download_url': url_for('employee.download_report_job', job_id=job.id)
+    }), 202
+
+@bp.route('/export-pdf-zip/jobs', methods=['POST'])
+@login_required
+def enqueue_employee_pdfs_zip():
+    """Lance la génération d'un PDF par employé (archive ZIP), éventuellement pour un département"""
+    if current_user.role not in ['admin', 'manager']:
+        return jsonify({'error': 'Accès refusé'}), 403
+    
+    department_id = request.values.get('department_id', type=int)
+    job = report_jobs.enqueue('employee_pdfs_zip', current_user.id, department_id=department_id)
+    return jsonify({
+        **job.to_dict(),
+        'status_url': url_for('employee.report_job_status', job_id=job.id),
+        'download_url': url_for('employee.download_report_job', job_id=job.id)
+    }), 202
+
+@bp.route('/jobs/<int:job_id>')
+@login_required
+def report_job_status(job_id):
+    """Avancement d'une génération de rapport"""
+    report_jobs.ensure_maintained(current_app._get_current_object())
+    job = ReportJob.query.get_or_404(job_id)
+    if job.user_id != current_user.id and not current_user.is_admin:
+        return jsonify({'error': 'Accès refusé'}), 403
+    return jsonify(job.to_dict())
+
+@bp.route('/jobs/<int:job_id>/download')
+@login_required
+def download_report_job(job_id):
+    """Télécharge le fichier produit par une génération terminée"""
+    job = ReportJob.query.get_or_404(job_id)
+    if job.user_id != current_user.id and not current_user.is_admin:
+        return redirect(url_for('employee.index'))
+    if job.status != 'done' or not job.file_path or not os.path.exists(job.file_path):
+        return jsonify(job.to_dict()), 409
+    
+    return send_file(
+        job.file_path,
+        as_attachment=True,
+        download_name=job.filename
+    )
+
+def stream_file(file, chunk_size=64 * 1024):
+    """Renvoie le contenu d'un fichier par morceaux puis le ferme"""
+    try:
+        file.seek(0)
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        file.close()
\ No newline at end of file
@@ -0,0 +1,53 @@
+from flask import Blueprint, Response, redirect, url_for, request, current_app, abort, stream_with_context
+from flask_login import login_required, current_user
+from datetime import datetime
+from tempfile import SpooledTemporaryFile
+from app.routes.employee import stream_file
+from app.services.tabular_export import tabular_export_service
+from app.services.read_replica import use_replica, iter_from_replica
+from app.services.metrics import exports_total
+
+bp = Blueprint('export', __name__, url_prefix='/exports')
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+@bp.route('/<dataset>.<fmt>')
+@login_required
+@use_replica
+def export(dataset, fmt):
+    """Export CSV ou XLSX des employés, congés ou soldes (?year=&department_id=&status=)"""
+    # Vérifier les permissions (seuls les admins et managers peuvent exporter)
+    if current_user.role not in ['admin', 'manager']:
+        # flash('Vous n\'avez pas les permissions pour exporter des données', 'error')  # Masqué pour environnement professionnel
+        return redirect(url_for('dashboard.index'))
+    
+    if dataset not in tabular_export_service.DATASETS or fmt not in ('csv', 'xlsx'):
+        abort(404)
+    
+    header, rows = tabular_export_service.dataset(
+        dataset,
+        year=request.args.get('year', type=int),
+        department_id=request.args.get('department_id', type=int),
+        status=request.args.get('status') or None
+    )
+    exports_total.inc(dataset=dataset, format=fmt)
+    filename = f"{dataset}_{datetime.now().strftime('%Y%m%d')}.{fmt}"
+    headers = {'Content-Disposition': f'attachment; filename="{filename}"'}
+    
+    if fmt == 'csv':
+        # Les lignes sont lues en base (réplica s'il existe) pendant l'envoi de la réponse
+        return Response(
+            stream_with_context(iter_from_replica(tabular_export_service.iter_csv(header, rows))),
+            mimetype='text/csv',
+            headers=headers
+        )
+    
+    # Un XLSX est une archive ZIP : il est écrit dans un fichier temporaire puis envoyé par morceaux
+    xlsx_file = SpooledTemporaryFile(max_size=current_app.config['PDF_SPOOL_MAX_SIZE'])
+    try:
+        tabular_export_service.write_xlsx(header, rows, xlsx_file)
+    except ImportError:
+        # openpyxl n'est pas installé : seul l'export CSV est disponible
+        xlsx_file.close()
+        abort(501)
+    return Response(stream_file(xlsx_file), mimetype=XLSX_MIMETYPE, headers=headers)
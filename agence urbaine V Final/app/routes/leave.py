@@ -1,14 +1,29 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, current_app
 from flask_login import login_required, current_user
 from app.models.leave import Leave
+from app.models.leave_ledger import LeaveLedger
+from app.models.employee import Employee
+from app.models.department import Department
 from app import db
+from sqlalchemy import func, or_, and_
+from sqlalchemy.orm import joinedload
 from flask_wtf import FlaskForm
 from wtforms import StringField, TextAreaField, SelectField, DateField
 from wtforms.validators import DataRequired, ValidationError
+from app.services.business_calendar import working_days
+from app.services.leave_index import leave_index
+from app.services.coverage import coverage_analyzer
+from app.services.leave_calendar import leave_calendar, decode_days
+from app.services.read_replica import use_replica
+from app.services.metrics import leave_submissions, leave_decisions
 from datetime import datetime, timedelta, date
 
 bp = Blueprint('leave', __name__, url_prefix='/leaves')
 
+# Pagination de la liste des congés
+PER_PAGE = 20
+MAX_PER_PAGE = 100
+
 class LeaveForm(FlaskForm):
     leave_type = SelectField('Type de congé', 
                            choices=[
@@ -25,33 +40,164 @@ class LeaveForm(FlaskForm):
         if field.data < self.start_date.data:
             raise ValidationError('La date de fin doit être postérieure à la date de début')
 
+def with_employee(query):
+    """Charge l'employé et son département avec le congé (évite une requête par ligne)"""
+    return query.options(joinedload(Leave.employee).joinedload(Employee.department))
+
+def get_filters():
+    """Lit les filtres de la liste des congés depuis la query string"""
+    return {
+        'status': request.args.get('status') or None,
+        'leave_type': request.args.get('leave_type') or None,
+        'department_id': request.args.get('department_id', type=int),
+        'date_from': request.args.get('date_from', type=date.fromisoformat),
+        'date_to': request.args.get('date_to', type=date.fromisoformat)
+    }
+
+def filter_args(filters):
+    """Filtres actifs sous forme de paramètres d'URL (liens de pagination)"""
+    return {
+        key: value.isoformat() if isinstance(value, date) else value
+        for key, value in filters.items() if value
+    }
+
+def apply_filters(query, filters):
+    """Applique côté serveur les filtres statut, type, département et période"""
+    if filters['status']:
+        query = query.filter(Leave.status == filters['status'])
+    if filters['leave_type']:
+        query = query.filter(Leave.leave_type == filters['leave_type'])
+    if filters['department_id']:
+        query = query.filter(Leave.employee.has(Employee.department_id == filters['department_id']))
+    # Congés chevauchant la période demandée
+    if filters['date_from']:
+        query = query.filter(Leave.end_date >= filters['date_from'])
+    if filters['date_to']:
+        query = query.filter(Leave.start_date <= filters['date_to'])
+    return query
+
+def encode_cursor(leave):
+    return f"{leave.created_at.isoformat()}_{leave.id}"
+
+def decode_cursor(cursor):
+    try:
+        created_at, leave_id = cursor.rsplit('_', 1)
+        return datetime.fromisoformat(created_at), int(leave_id)
+    except (AttributeError, ValueError):
+        return None
+
+def keyset_page(query):
+    """Pagination par curseur sur (created_at, id), du plus récent au plus ancien
+
+    Retourne la page de congés et le curseur de la page suivante (None en fin de liste).
+    """
+    per_page = max(1, min(request.args.get('per_page', PER_PAGE, type=int), MAX_PER_PAGE))
+    position = decode_cursor(request.args.get('cursor'))
+    if position:
+        created_at, leave_id = position
+        query = query.filter(or_(
+            Leave.created_at < created_at,
+            and_(Leave.created_at == created_at, Leave.id < leave_id)
+        ))
+    
+    leaves = query.order_by(Leave.created_at.desc(), Leave.id.desc()).limit(per_page + 1).all()
+    next_cursor = encode_cursor(leaves[per_page - 1]) if len(leaves) > per_page else None
+    return leaves[:per_page], next_cursor
+
+def leave_to_dict(leave):
+    return {
+        'id': leave.id,
+        'employee_id': leave.employee_id,
+        'employee_name': f"{leave.employee.first_name} {leave.employee.last_name}",
+        'department': leave.employee.department.name if leave.employee.department else None,
+        'leave_type': leave.leave_type,
+        'status': leave.status,
+        'start_date': leave.start_date.isoformat(),
+        'end_date': leave.end_date.isoformat(),
+        'created_at': leave.created_at.isoformat(),
+        'url': url_for('leave.view', id=leave.id)
+    }
+
+def add_overlap_error(form, conflicts):
+    """Erreur de chevauchement affichée sous le champ (les messages flash étant masqués)"""
+    _, conflict_start, conflict_end, _ = conflicts[0]
+    form.start_date.errors.append(
+        f'Cette demande chevauche un congé existant '
+        f'(du {conflict_start.strftime("%d/%m/%Y")} au {conflict_end.strftime("%d/%m/%Y")}).')
+
+def coverage_to_dict(coverage):
+    data = dict(coverage)
+    data['days'] = [dict(day, date=day['date'].isoformat()) for day in coverage['days']]
+    if 'risky_days' in coverage:
+        data['risky_days'] = [day['date'].isoformat() for day in coverage['risky_days']]
+    return data
+
 @bp.route('/')
 @login_required
+@use_replica
 def index():
-    if current_user.is_admin or current_user.is_manager:
-        leaves = Leave.query.order_by(Leave.created_at.desc()).all()
-    else:
-        leaves = Leave.query.filter_by(employee_id=current_user.employee.id)\
-                          .order_by(Leave.created_at.desc()).all()
+    query = with_employee(Leave.query)
+    if not (current_user.is_admin or current_user.is_manager):
+        query = query.filter(Leave.employee_id == current_user.employee.id)
+    
+    filters = get_filters()
+    leaves, next_cursor = keyset_page(apply_filters(query, filters))
+    
+    if request.args.get('format') == 'json':
+        return jsonify({
+            'leaves': [leave_to_dict(leave) for leave in leaves],
+            'next_cursor': next_cursor
+        })
+    
     return render_template('leaves/list.html', 
                          title='Demandes de congés',
-                         leaves=leaves)
+                         leaves=leaves,
+                         next_cursor=next_cursor,
+                         filters=filters,
+                         filter_args=filter_args(filters),
+                         departments=Department.query.order_by(Department.name).all())
 
 @bp.route('/request', methods=['GET', 'POST'])
 @login_required
 def request_leave():
     form = LeaveForm()
     if form.validate_on_submit():
+        employee_id = current_user.employee.id
+        start_date, end_date = form.start_date.data, form.end_date.data
+        
+        # Refuser une demande chevauchant un congé approuvé ou en attente (index mémoire, sans requête)
+        conflicts = leave_index.overlapping(employee_id, start_date, end_date)
+        if conflicts:
+            add_overlap_error(form, conflicts)
+            return render_template('leaves/request.html',
+                                 title='Demande de congé',
+                                 form=form)
+        
+        # L'index des autres workers peut avoir quelques secondes de retard : la demande
+        # est revérifiée en base dans la transaction, sous verrou de la ligne employé
+        # (SELECT ... FOR UPDATE ; sous SQLite, l'insertion prend le verrou d'écriture)
+        db.session.query(Employee.id).filter(Employee.id == employee_id).with_for_update().one()
         leave = Leave(
-            employee_id=current_user.employee.id,
+            employee_id=employee_id,
             leave_type=form.leave_type.data,
-            start_date=form.start_date.data,
-            end_date=form.end_date.data,
+            start_date=start_date,
+            end_date=end_date,
             reason=form.reason.data,
             status='pending'
         )
         db.session.add(leave)
+        db.session.flush()
+        conflicts = leave_index.overlapping_in_database(employee_id, start_date, end_date, exclude_id=leave.id)
+        if conflicts:
+            db.session.rollback()
+            add_overlap_error(form, conflicts)
+            return render_template('leaves/request.html',
+                                 title='Demande de congé',
+                                 form=form)
+        
+        LeaveLedger.record(leave)
         db.session.commit()
+        leave_submissions.inc(leave_type=leave.leave_type)
         # flash('Votre demande de congé a été soumise avec succès', 'success')  # Masqué pour environnement professionnel
         return redirect(url_for('leave.index'))
     
@@ -62,14 +208,20 @@ def request_leave():
 @bp.route('/<int:id>')
 @login_required
 def view(id):
-    leave = Leave.query.get_or_404(id)
+    leave = with_employee(Leave.query).filter_by(id=id).first_or_404()
     if not (current_user.is_admin or current_user.is_manager) and leave.employee_id != current_user.employee.id:
         # flash('Vous n\'êtes pas autorisé à voir cette demande de congé', 'error')  # Masqué pour environnement professionnel
         return redirect(url_for('leave.index'))
     
+    # Couverture du département sur la période, pour la décision d'approbation
+    coverage = None
+    if current_user.is_admin or current_user.is_manager:
+        coverage = coverage_analyzer.approval_risk(leave)
+    
     return render_template('leaves/view.html',
                          title='Détails du congé',
-                         leave=leave)
+                         leave=leave,
+                         coverage=coverage)
 
 @bp.route('/<int:id>/approve', methods=['POST'])
 @login_required
@@ -79,8 +231,18 @@ def approve(id):
         return redirect(url_for('leave.index'))
     
     leave = Leave.query.get_or_404(id)
+    
+    # Une approbation passant sous le seuil de couverture doit être confirmée
+    if leave.status != 'approved' and not request.form.get('confirm_low_coverage'):
+        coverage = coverage_analyzer.approval_risk(leave)
+        if coverage and coverage['risky_days']:
+            return redirect(url_for('leave.view', id=id))
+    
+    previous_status = leave.status
     leave.status = 'approved'
+    LeaveLedger.record(leave, previous_status)
     db.session.commit()
+    leave_decisions.inc(decision='approved')
     # flash('La demande de congé a été approuvée', 'success')  # Masqué pour environnement professionnel
     return redirect(url_for('leave.view', id=id))
 
@@ -92,8 +254,11 @@ def reject(id):
         return redirect(url_for('leave.index'))
     
     leave = Leave.query.get_or_404(id)
+    previous_status = leave.status
     leave.status = 'rejected'
+    LeaveLedger.record(leave, previous_status)
     db.session.commit()
+    leave_decisions.inc(decision='rejected')
     # flash('La demande de congé a été rejetée', 'warning')  # Masqué pour environnement professionnel
     return redirect(url_for('leave.view', id=id))
 
@@ -101,42 +266,163 @@ def reject(id):
 @login_required
 def calculate_days():
     data = request.get_json()
-    start_date = datetime.strptime(data['start_date'], '%Y-%m-%d')
-    end_date = datetime.strptime(data['end_date'], '%Y-%m-%d')
-    
-    # Calculer le nombre de jours ouvrables (lundi-vendredi)
-    days = 0
-    current_date = start_date
-    while current_date <= end_date:
-        if current_date.weekday() < 5:  # 0-4 représentent lundi-vendredi
-            days += 1
-        current_date += timedelta(days=1)
+    start_date = datetime.strptime(data['start_date'], '%Y-%m-%d').date()
+    end_date = datetime.strptime(data['end_date'], '%Y-%m-%d').date()
     
-    return jsonify({'days': days})
+    # Nombre de jours ouvrables (hors week-end et jours fériés)
+    return jsonify({'days': working_days(start_date, end_date)})
 
 @bp.route('/my-leaves')
 @login_required
+@use_replica
 def my_leaves():
-    leaves = Leave.query.filter_by(employee_id=current_user.employee.id)\
-                       .order_by(Leave.created_at.desc()).all()
+    query = Leave.query.filter(Leave.employee_id == current_user.employee.id)
+    leaves, next_cursor = keyset_page(query)
+    
+    # Totaux par statut sur tout l'historique, indépendamment de la page affichée
+    status_counts = dict(
+        db.session.query(Leave.status, func.count(Leave.id))
+                  .filter(Leave.employee_id == current_user.employee.id)
+                  .group_by(Leave.status).all()
+    )
     return render_template('leaves/my_leaves.html',
                          title='Mes congés',
-                         leaves=leaves) 
+                         leaves=leaves,
+                         next_cursor=next_cursor,
+                         status_counts=status_counts) 
 
 @bp.route('/current')
 @login_required
+@use_replica
 def current_leaves():
     """Afficher la liste des employés actuellement en congé"""
     today = date.today()
     
-    # Récupérer tous les congés actifs (en cours aujourd'hui)
-    current_leaves = Leave.query.filter(
-        Leave.start_date <= today,
-        Leave.end_date >= today,
-        Leave.status == 'approved'
-    ).order_by(Leave.start_date).all()
+    # Récupérer tous les congés actifs (en cours aujourd'hui) via l'index mémoire
+    leave_ids = [leave_id for leave_id, *_ in leave_index.absent_on(today)]
+    current_leaves = with_employee(Leave.query).filter(
+        Leave.id.in_(leave_ids)
+    ).order_by(Leave.start_date).all() if leave_ids else []
     
     return render_template('leaves/current.html', 
                          title='Employés en congé',
                          current_leaves=current_leaves,
-                         today=today) 
\ No newline at end of file
+                         today=today)
+
+@bp.route('/absences')
+@login_required
+def absences():
+    """Absences (JSON) un jour donné (?date=) ou sur une période (?start=&end=)"""
+    if not (current_user.is_admin or current_user.is_manager):
+        return jsonify({'error': 'Accès refusé'}), 403
+    
+    day = request.args.get('date', type=date.fromisoformat)
+    start = request.args.get('start', type=date.fromisoformat) or day or date.today()
+    end = request.args.get('end', type=date.fromisoformat) or day or start
+    if end < start:
+        return jsonify({'error': 'La date de fin doit être postérieure à la date de début'}), 400
+    
+    statuses = ('approved',) if request.args.get('status') == 'approved' else ('approved', 'pending')
+    absences = leave_index.absences_in_range(start, end, statuses)
+    return jsonify({
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'absences': [
+            {
+                'leave_id': leave_id,
+                'employee_id': employee_id,
+                'start_date': leave_start.isoformat(),
+                'end_date': leave_end.isoformat(),
+                'status': status
+            }
+            for leave_id, employee_id, leave_start, leave_end, status in absences
+        ]
+    })
+
+@bp.route('/coverage')
+@login_required
+def coverage():
+    """Couverture (JSON) d'un département jour par jour (?department_id=&start=&end=)"""
+    if not (current_user.is_admin or current_user.is_manager):
+        return jsonify({'error': 'Accès refusé'}), 403
+    
+    department_id = request.args.get('department_id', type=int)
+    if department_id is None or db.session.get(Department, department_id) is None:
+        return jsonify({'error': 'Département introuvable'}), 404
+    
+    start = request.args.get('start', type=date.fromisoformat) or date.today()
+    end = request.args.get('end', type=date.fromisoformat) or start + timedelta(days=30)
+    if end < start:
+        return jsonify({'error': 'La date de fin doit être postérieure à la date de début'}), 400
+    if (end - start).days >= current_app.config['COVERAGE_MAX_DAYS']:
+        return jsonify({'error': 'Période trop longue'}), 400
+    
+    return jsonify(coverage_to_dict(coverage_analyzer.department_coverage(department_id, start, end)))
+
+@bp.route('/<int:id>/coverage')
+@login_required
+def leave_coverage(id):
+    """Couverture (JSON) du département si le congé est approuvé"""
+    if not (current_user.is_admin or current_user.is_manager):
+        return jsonify({'error': 'Accès refusé'}), 403
+    
+    leave = with_employee(Leave.query).filter_by(id=id).first_or_404()
+    coverage = coverage_analyzer.approval_risk(leave)
+    if coverage is None:
+        return jsonify({'error': 'Employé sans département'}), 404
+    return jsonify(coverage_to_dict(coverage))
+
+@bp.route('/calendar')
+@login_required
+def calendar():
+    """Calendrier mensuel des absences d'un département (?department_id=&month=AAAA-MM)"""
+    if not (current_user.is_admin or current_user.is_manager):
+        # flash('Vous n\'êtes pas autorisé à consulter le calendrier', 'error')  # Masqué pour environnement professionnel
+        return redirect(url_for('leave.index'))
+    
+    departments = Department.query.order_by(Department.name).all()
+    department_id = request.args.get('department_id', type=int)
+    if department_id is not None:
+        db.get_or_404(Department, department_id)
+    elif departments:
+        department_id = departments[0].id
+    
+    try:
+        year, month = map(int, request.args.get('month', date.today().strftime('%Y-%m')).split('-'))
+        first_day = date(year, month, 1)
+    except ValueError:
+        first_day = date.today().replace(day=1)
+    
+    grid = leave_calendar.month_grid(department_id, first_day.year, first_day.month) if department_id else None
+    
+    if request.args.get('format') == 'json':
+        if grid is None:
+            return jsonify({'error': 'Département introuvable'}), 404
+        return jsonify(grid)
+    
+    # Décodage des bitsets pour l'affichage : état de chaque case employé x jour
+    rows = []
+    non_working = set()
+    if grid:
+        days = range(1, grid['days_in_month'] + 1)
+        non_working = set(decode_days(grid['non_working'], grid['days_in_month']))
+        for employee in grid['employees']:
+            approved = set(decode_days(employee['approved'], grid['days_in_month']))
+            pending = set(decode_days(employee['pending'], grid['days_in_month']))
+            rows.append((employee, [
+                'approved' if day in approved else 'pending' if day in pending else None
+                for day in days
+            ]))
+    
+    previous_month = (first_day - timedelta(days=1)).strftime('%Y-%m')
+    next_month = (first_day + timedelta(days=31)).strftime('%Y-%m')
+    return render_template('leaves/calendar.html',
+                         title='Calendrier des absences',
+                         departments=departments,
+                         department_id=department_id,
+                         first_day=first_day,
+                         grid=grid,
+                         rows=rows,
+                         non_working=non_working,
+                         previous_month=previous_month,
+                         next_month=next_month)
@@ -0,0 +1,19 @@
+import hmac
+from flask import Blueprint, Response, request, current_app, abort
+from flask_login import current_user
+from app.services.metrics import metrics
+
+bp = Blueprint('metrics', __name__)
+
+@bp.route('/metrics')
+def index():
+    """Métriques au format texte Prometheus (jeton METRICS_TOKEN ou administrateur connecté)"""
+    token = current_app.config['METRICS_TOKEN']
+    authorization = request.headers.get('Authorization', '')
+    if token and hmac.compare_digest(authorization.encode('utf-8'), f'Bearer {token}'.encode('utf-8')):
+        pass
+    elif not (current_user.is_authenticated and current_user.is_admin):
+        abort(403)
+    
+    return Response(metrics.render(current_app._get_current_object()),
+                    content_type='text/plain; version=0.0.4; charset=utf-8')
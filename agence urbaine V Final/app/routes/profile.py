@@ -5,6 +5,7 @@ from flask_wtf import FlaskForm
 from wtforms import StringField, PasswordField
 from wtforms.validators import DataRequired, Email, Length, EqualTo
 from app.models.user import User
+from app.services.identity import identity_cache
 
 bp = Blueprint('profile', __name__, url_prefix='/profile')
 
@@ -33,6 +34,7 @@ def index():
         current_user.email = form.email.data
         current_user.username = form.username.data
         db.session.commit()
+        identity_cache.invalidate(current_user.id)
         # flash('Profil mis à jour avec succès', 'success')  # Masqué pour environnement professionnel
         return redirect(url_for('profile.index'))
     
@@ -0,0 +1,101 @@
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+from flask import current_app, has_app_context
+
+# Jours fériés à date fixe au Maroc : (mois, jour)
+FIXED_HOLIDAYS = [
+    (1, 1),    # Nouvel an
+    (1, 11),   # Manifeste de l'indépendance
+    (5, 1),    # Fête du travail
+    (7, 30),   # Fête du Trône
+    (8, 14),   # Allégeance Oued Ed-Dahab
+    (8, 20),   # Révolution du Roi et du Peuple
+    (8, 21),   # Fête de la jeunesse
+    (11, 6),   # Marche Verte
+    (11, 18),  # Fête de l'indépendance
+]
+
+# Nouvel an amazigh, férié depuis 2024
+AMAZIGH_NEW_YEAR = (1, 14)
+AMAZIGH_NEW_YEAR_SINCE = 2024
+
+# Fêtes religieuses (calendrier hégirien) précalculées : premier jour et nombre de jours.
+# Dates estimées : elles dépendent de l'observation du croissant et peuvent être
+# corrigées d'un jour via EXTRA_HOLIDAYS.
+ISLAMIC_HOLIDAYS = {
+    2024: [(date(2024, 4, 10), 2), (date(2024, 6, 17), 2), (date(2024, 7, 8), 1), (date(2024, 9, 16), 2)],
+    2025: [(date(2025, 3, 31), 2), (date(2025, 6, 7), 2), (date(2025, 6, 27), 1), (date(2025, 9, 5), 2)],
+    2026: [(date(2026, 3, 20), 2), (date(2026, 5, 27), 2), (date(2026, 6, 17), 1), (date(2026, 8, 26), 2)],
+    2027: [(date(2027, 3, 10), 2), (date(2027, 5, 17), 2), (date(2027, 6, 6), 1), (date(2027, 8, 15), 2)],
+    2028: [(date(2028, 2, 27), 2), (date(2028, 5, 5), 2), (date(2028, 5, 26), 1), (date(2028, 8, 4), 2)],
+    2029: [(date(2029, 2, 15), 2), (date(2029, 4, 24), 2), (date(2029, 5, 15), 1), (date(2029, 7, 24), 2)],
+    2030: [(date(2030, 2, 5), 2), (date(2030, 4, 14), 2), (date(2030, 5, 4), 1), (date(2030, 7, 14), 2)],
+}
+
+def moroccan_holidays(years):
+    """Jours fériés marocains (fixes et religieux) pour les années données"""
+    holidays = set()
+    for year in years:
+        for month, day in FIXED_HOLIDAYS:
+            holidays.add(date(year, month, day))
+        if year >= AMAZIGH_NEW_YEAR_SINCE:
+            holidays.add(date(year, *AMAZIGH_NEW_YEAR))
+        for first_day, length in ISLAMIC_HOLIDAYS.get(year, []):
+            holidays.update(first_day + timedelta(days=i) for i in range(length))
+    return holidays
+
+class BusinessCalendar:
+    """Décompte des jours ouvrables (hors week-end et jours fériés)
+
+    Le décompte d'une période est en temps constant pour les week-ends
+    et logarithmique (recherche dichotomique) pour les jours fériés.
+    """
+
+    def __init__(self, weekend=(5, 6), holidays=()):
+        self.weekend = frozenset(weekend)  # 0 = lundi ... 6 = dimanche
+        self.working_days_per_week = 7 - len(self.weekend)
+        # Seuls les fériés tombant un jour travaillé réduisent le décompte
+        self.holidays = sorted({d for d in holidays if d.weekday() not in self.weekend})
+
+    def is_working_day(self, day):
+        return day.weekday() not in self.weekend and not self.is_holiday(day)
+
+    def is_holiday(self, day):
+        index = bisect_left(self.holidays, day)
+        return index < len(self.holidays) and self.holidays[index] == day
+
+    def count(self, start, end):
+        """Nombre de jours ouvrables entre start et end inclus"""
+        if end < start:
+            return 0
+        total_days = (end - start).days + 1
+        full_weeks, remainder = divmod(total_days, 7)
+        first_weekday = start.weekday()
+        working_days = full_weeks * self.working_days_per_week + sum(
+            1 for i in range(remainder) if (first_weekday + i) % 7 not in self.weekend
+        )
+        holidays = bisect_right(self.holidays, end) - bisect_left(self.holidays, start)
+        return working_days - holidays
+
+    def count_many(self, ranges):
+        """Décompte par lot : liste des jours ouvrables pour chaque (start, end)"""
+        return [self.count(start, end) for start, end in ranges]
+
+_calendars = {}
+
+def get_calendar():
+    """Calendrier configuré pour l'application courante (WEEKEND_DAYS, EXTRA_HOLIDAYS)"""
+    config = current_app.config if has_app_context() else {}
+    weekend = tuple(config.get('WEEKEND_DAYS', (5, 6)))
+    extra_holidays = tuple(config.get('EXTRA_HOLIDAYS', ()))
+    key = (weekend, extra_holidays)
+    if key not in _calendars:
+        this_year = date.today().year
+        holidays = moroccan_holidays(range(this_year - 10, this_year + 6))
+        holidays.update(date.fromisoformat(day) for day in extra_holidays)
+        _calendars[key] = BusinessCalendar(weekend, holidays)
+    return _calendars[key]
+
+def working_days(start, end):
+    """Raccourci : jours ouvrables entre start et end inclus selon le calendrier configuré"""
+    return get_calendar().count(start, end)
@@ -0,0 +1,71 @@
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+class TTLCache:
+    """Cache mémoire par processus, avec expiration et invalidation explicite"""
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return default
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+
+    def get_or_set(self, key, factory, ttl=None):
+        """Retourne la valeur en cache ou la calcule avec factory()"""
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = factory()
+            if (self.ttl if ttl is None else ttl) > 0:
+                self.set(key, value, ttl)
+        return value
+
+    def invalidate(self, key=None):
+        """Supprime une entrée, ou tout le cache si key est None"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def invalidate_where(self, predicate):
+        """Supprime les entrées dont la clé vérifie predicate(key)"""
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+
+def invalidate_on_commit(cache, *models):
+    """Vide le cache après chaque commit modifiant une instance de l'un des modèles"""
+    flag = f'invalidate_cache_{id(cache)}'
+
+    @event.listens_for(Session, 'after_flush')
+    def _mark_changes(session, flush_context):
+        if any(isinstance(obj, models)
+               for obj in (*session.new, *session.dirty, *session.deleted)):
+            session.info[flag] = True
+
+    @event.listens_for(Session, 'after_commit')
+    def _invalidate(session):
+        if session.info.pop(flag, False):
+            cache.invalidate()
+
+    @event.listens_for(Session, 'after_rollback')
+    def _discard(session):
+        session.info.pop(flag, None)
@@ -0,0 +1,103 @@
+from datetime import timedelta
+from flask import current_app
+from app.models.employee import Employee
+from app.services.business_calendar import get_calendar
+from app.services.leave_index import leave_index
+from app import db
+
+class CoverageAnalyzer:
+    """Taux de présence d'un département jour par jour (présents / effectif)
+
+    Les absences de la période sont lues dans l'index des congés, fusionnées
+    par employé (un employé n'est compté qu'une fois par jour), puis cumulées
+    avec un tableau de différences : O(congés + jours) quel que soit l'effectif.
+    """
+
+    def min_coverage(self, department_id):
+        """Seuil de présence minimal du département (DEPARTMENT_MIN_COVERAGE, sinon MIN_DEPARTMENT_COVERAGE)"""
+        config = current_app.config
+        return config['DEPARTMENT_MIN_COVERAGE'].get(department_id, config['MIN_DEPARTMENT_COVERAGE'])
+
+    def department_coverage(self, department_id, start, end, statuses=('approved',), extra_absences=()):
+        """Couverture jour par jour de [start, end]
+
+        extra_absences : absences supplémentaires [(employee_id, start, end)],
+        par exemple une demande en attente dont on simule l'approbation.
+        """
+        employee_ids = {
+            employee_id for employee_id, in
+            db.session.query(Employee.id).filter(Employee.department_id == department_id)
+        }
+        headcount = len(employee_ids)
+
+        absences = {}
+        for _, employee_id, leave_start, leave_end, _ in leave_index.absences_in_range(start, end, statuses):
+            if employee_id in employee_ids:
+                absences.setdefault(employee_id, []).append((leave_start, leave_end))
+        for employee_id, leave_start, leave_end in extra_absences:
+            if employee_id in employee_ids:
+                absences.setdefault(employee_id, []).append((leave_start, leave_end))
+
+        # Tableau de différences : +1 au premier jour d'absence, -1 au lendemain du dernier
+        length = (end - start).days + 1
+        diff = [0] * (length + 1)
+        for intervals in absences.values():
+            for leave_start, leave_end in self._merge(intervals):
+                first = max(leave_start, start)
+                last = min(leave_end, end)
+                if first <= last:
+                    diff[(first - start).days] += 1
+                    diff[(last - start).days + 1] -= 1
+
+        threshold = self.min_coverage(department_id)
+        calendar = get_calendar()
+        days = []
+        absent = 0
+        for offset in range(length):
+            absent += diff[offset]
+            day = start + timedelta(days=offset)
+            coverage = (headcount - absent) / headcount if headcount else None
+            working_day = calendar.is_working_day(day)
+            days.append({
+                'date': day,
+                'absent': absent,
+                'present': headcount - absent,
+                'coverage': coverage,
+                'working_day': working_day,
+                'below_threshold': working_day and coverage is not None and coverage < threshold
+            })
+        return {
+            'department_id': department_id,
+            'headcount': headcount,
+            'threshold': threshold,
+            'days': days
+        }
+
+    def approval_risk(self, leave):
+        """Couverture du département de l'employé si le congé est approuvé ; None sans département"""
+        department_id = leave.employee.department_id
+        if department_id is None:
+            return None
+
+        # Un congé déjà approuvé est compté par l'index ; sinon on simule son approbation
+        extra = () if leave.status == 'approved' else [(leave.employee_id, leave.start_date, leave.end_date)]
+        coverage = self.department_coverage(department_id, leave.start_date, leave.end_date,
+                                            extra_absences=extra)
+        working = [day for day in coverage['days'] if day['working_day'] and day['coverage'] is not None]
+        coverage['risky_days'] = [day for day in working if day['below_threshold']]
+        coverage['min_coverage'] = min((day['coverage'] for day in working), default=None)
+        return coverage
+
+    @staticmethod
+    def _merge(intervals):
+        """Fusionne les intervalles de dates qui se chevauchent ou se touchent"""
+        merged = []
+        for start, end in sorted(intervals):
+            if merged and start <= merged[-1][1] + timedelta(days=1):
+                if end > merged[-1][1]:
+                    merged[-1][1] = end
+            else:
+                merged.append([start, end])
+        return merged
+
+coverage_analyzer = CoverageAnalyzer()
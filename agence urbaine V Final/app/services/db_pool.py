@@ -0,0 +1,105 @@
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+class PoolMetrics:
+    """Statistiques d'attente des connexions d'un pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait, timed_out=False):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            if timed_out:
+                self.timeouts += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'wait_seconds_total': round(self.total_wait, 6),
+                'wait_seconds_max': round(self.max_wait, 6),
+                'wait_seconds_avg': round(self.total_wait / self.checkouts, 6) if self.checkouts else 0.0
+            }
+
+class MeteredQueuePool(QueuePool):
+    """QueuePool mesurant le temps d'attente de chaque emprunt de connexion"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.record(time.perf_counter() - started, timed_out=True)
+            raise
+        self.metrics.record(time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        # Les statistiques survivent à engine.dispose()
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+POOL_SIZING_OPTIONS = ('pool_size', 'max_overflow', 'pool_recycle', 'pool_timeout')
+
+def apply_pool_class(app):
+    """Utilise le pool instrumenté sauf si la configuration impose une autre classe"""
+    options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    url = make_url(app.config['SQLALCHEMY_DATABASE_URI'])
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        # SQLite en mémoire : Flask-SQLAlchemy impose un StaticPool, sans dimensionnement
+        for name in POOL_SIZING_OPTIONS:
+            options.pop(name, None)
+    else:
+        options.setdefault('poolclass', MeteredQueuePool)
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+def configure_sqlite(engine, app):
+    """Mode WAL et délai d'attente des verrous pour les bases SQLite fichier"""
+    if engine.dialect.name != 'sqlite' or engine.url.database in (None, '', ':memory:'):
+        return
+    wal = app.config['SQLITE_WAL']
+    busy_timeout = app.config['SQLITE_BUSY_TIMEOUT']
+
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f'PRAGMA busy_timeout = {int(busy_timeout)}')
+        if wal:
+            cursor.execute('PRAGMA journal_mode = WAL')
+            cursor.execute('PRAGMA synchronous = NORMAL')
+        cursor.close()
+
+def pool_status(engine):
+    """État du pool : connexions empruntées, débordement, attente"""
+    pool = engine.pool
+    status = {'pool_class': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            'size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'checked_in': pool.checkedin(),
+            'overflow': max(0, pool.overflow()),
+            'max_overflow': pool._max_overflow,
+            'timeout': pool.timeout()
+        })
+    metrics = getattr(pool, 'metrics', None)
+    if metrics is not None:
+        status.update(metrics.snapshot())
+    return status
@@ -0,0 +1,221 @@
+import csv
+import io
+import os
+import time
+from datetime import date, datetime
+from sqlalchemy import func, insert, or_
+from sqlalchemy.exc import IntegrityError
+from werkzeug.datastructures import MultiDict
+from app.models.department import Department
+from app.models.employee import Employee
+from app.models.user import User
+from app.services.passwords import password_hasher
+from app import db
+
+# Colonnes attendues (ligne d'en-tête), dans l'ordre du modèle de fichier
+COLUMNS = ('first_name', 'last_name', 'email', 'date_of_birth', 'gender', 'address', 'phone',
+           'department', 'position', 'annual_leave_days', 'role', 'password')
+
+class EmployeeImportError(ValueError):
+    """Fichier d'import illisible (format, en-tête)"""
+
+def _cell_to_str(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip()
+
+def _check_header(header):
+    header = [_cell_to_str(name).lower() for name in header]
+    missing = [name for name in ('first_name', 'last_name', 'email', 'department') if name not in header]
+    if missing:
+        raise EmployeeImportError(f"Colonnes manquantes : {', '.join(missing)}")
+    return header
+
+def read_csv(stream):
+    """Lignes d'un CSV UTF-8 (séparateur ',' ou ';') : (numéro de ligne, {colonne: valeur})"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    first_line = text.readline()
+    delimiter = ';' if first_line.count(';') > first_line.count(',') else ','
+    header = _check_header(next(csv.reader([first_line], delimiter=delimiter), []))
+    for line_number, values in enumerate(csv.reader(text, delimiter=delimiter), start=2):
+        if any(value.strip() for value in values):
+            yield line_number, dict(zip(header, (value.strip() for value in values)))
+
+def read_xlsx(stream):
+    """Lignes de la première feuille d'un classeur XLSX (lecture en flux)"""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise EmployeeImportError("Le module openpyxl est requis pour importer des fichiers XLSX")
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = _check_header(next(rows, ()))
+        for line_number, values in enumerate(rows, start=2):
+            values = [_cell_to_str(value) for value in values]
+            if any(values):
+                yield line_number, dict(zip(header, values))
+    finally:
+        workbook.close()
+
+READERS = {'.csv': read_csv, '.xlsx': read_xlsx}
+
+class EmployeeImportService:
+    """Import en masse d'employés depuis un fichier CSV ou XLSX
+
+    Chaque ligne est validée avec les règles du formulaire d'ajout ; les
+    départements sont résolus par nom via une table chargée une fois, l'unicité
+    des emails et identifiants est vérifiée par une requête IN par lot, puis
+    utilisateurs et employés sont insérés en masse (executemany) et validés
+    lot par lot. Chaque lot est inséré dans un point de sauvegarde : en cas de
+    conflit d'unicité (import concurrent), les lignes en cause sont signalées.
+    """
+
+    CHUNK_SIZE = 500
+
+    def __init__(self, form_class, chunk_size=None):
+        self.form_class = form_class
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+
+    def import_file(self, stream, filename):
+        """Importe le fichier ; retourne {'total', 'created', 'errors': [(ligne, [messages])], 'seconds'}"""
+        reader = READERS.get(os.path.splitext(filename or '')[1].lower())
+        if reader is None:
+            raise EmployeeImportError('Format non pris en charge (CSV ou XLSX attendu)')
+
+        started = time.perf_counter()
+        departments = {name.strip().lower(): department_id
+                       for department_id, name in db.session.query(Department.id, Department.name)}
+        choices = [(department_id, name) for name, department_id in departments.items()]
+
+        result = {'total': 0, 'created': 0, 'errors': []}
+        seen = set()  # emails et identifiants déjà présents dans le fichier
+        chunk = []
+        for line_number, row in reader(stream):
+            result['total'] += 1
+            values, errors = self.validate_row(row, departments, choices)
+            if not errors:
+                keys = {('email', values['email'].lower()), ('username', values['username'].lower())}
+                if keys & seen:
+                    errors = ['Email ou identifiant en double dans le fichier']
+                seen |= keys
+            if errors:
+                result['errors'].append((line_number, errors))
+                continue
+            chunk.append((line_number, values))
+            if len(chunk) >= self.chunk_size:
+                self.insert_chunk(chunk, result)
+                chunk = []
+        if chunk:
+            self.insert_chunk(chunk, result)
+
+        result['errors'].sort()
+        result['seconds'] = time.perf_counter() - started
+        return result
+
+    def validate_row(self, row, departments, choices):
+        """Valide une ligne avec le formulaire d'ajout ; retourne (valeurs, erreurs)"""
+        errors = []
+        data = MultiDict({name: value for name, value in row.items() if name in COLUMNS and value})
+        department_name = data.pop('department', '')
+        department_id = departments.get(department_name.lower())
+        if department_id is None:
+            errors.append(f'Département inconnu : {department_name}' if department_name else 'Département requis')
+        else:
+            data['department_id'] = str(department_id)
+        # Pas de double saisie dans un fichier : la confirmation reprend le mot de passe
+        if 'password' in data:
+            data['confirm_password'] = data['password']
+
+        form = self.form_class(formdata=data, meta={'csrf': False}, department_choices=choices)
+        if not form.validate():
+            for name, messages in form.errors.items():
+                if name == 'department_id':
+                    continue
+                label = getattr(form, name).label.text
+                errors.extend(f'{label} : {message}' for message in messages)
+        if errors:
+            return None, errors
+
+        return {
+            'email': form.email.data,
+            'username': form.email.data.split('@')[0],
+            'role': form.role.data,
+            'password': form.password.data,
+            'first_name': form.first_name.data,
+            'last_name': form.last_name.data,
+            'date_of_birth': form.date_of_birth.data,
+            'gender': form.gender.data,
+            'address': form.address.data,
+            'phone': form.phone.data,
+            'department_id': department_id,
+            'position': form.position.data,
+            'annual_leave_days': form.annual_leave_days.data
+        }, []
+
+    def taken_keys(self, emails, usernames):
+        """Emails et identifiants déjà pris en base (en minuscules) : (emails, identifiants)"""
+        taken_emails, taken_usernames = set(), set()
+        for email, username in db.session.query(User.email, User.username).filter(
+                or_(func.lower(User.email).in_(emails), func.lower(User.username).in_(usernames))):
+            taken_emails.add(email.lower())
+            taken_usernames.add(username.lower())
+        return taken_emails, taken_usernames
+
+    def insert_chunk(self, chunk, result):
+        """Insère un lot de lignes valides après vérification d'unicité en base"""
+        taken_emails, taken_usernames = self.taken_keys(
+            [values['email'].lower() for _, values in chunk],
+            [values['username'].lower() for _, values in chunk])
+
+        rows = []
+        for line_number, values in chunk:
+            if values['email'].lower() in taken_emails or values['username'].lower() in taken_usernames:
+                result['errors'].append((line_number, ['Un utilisateur avec cet email ou cet identifiant existe déjà']))
+            else:
+                rows.append((line_number, values))
+        if not rows:
+            return
+
+        password_hashes = password_hasher.hash_many(values['password'] for _, values in rows)
+        try:
+            with db.session.begin_nested():
+                self.insert_rows([values for _, values in rows], password_hashes)
+            created = len(rows)
+        except IntegrityError:
+            # Conflit avec une écriture concurrente : ligne par ligne pour isoler les lignes en cause
+            created = 0
+            for (line_number, values), password_hash in zip(rows, password_hashes):
+                try:
+                    with db.session.begin_nested():
+                        self.insert_rows([values], [password_hash])
+                    created += 1
+                except IntegrityError:
+                    result['errors'].append((line_number, ['Un utilisateur avec cet email ou cet identifiant existe déjà']))
+        db.session.commit()
+        result['created'] += created
+
+    def insert_rows(self, rows, password_hashes):
+        """Insertion en masse (executemany) des utilisateurs puis des employés"""
+        db.session.execute(insert(User), [
+            {'email': values['email'], 'username': values['username'], 'role': values['role'],
+             'password_hash': password_hash, 'is_active': True}
+            for values, password_hash in zip(rows, password_hashes)
+        ])
+        user_ids = dict(db.session.query(User.email, User.id).filter(
+            User.email.in_([values['email'] for values in rows])))
+        hire_date = datetime.utcnow().date()
+        db.session.execute(insert(Employee), [
+            {'user_id': user_ids[values['email']], 'first_name': values['first_name'],
+             'last_name': values['last_name'], 'date_of_birth': values['date_of_birth'],
+             'gender': values['gender'], 'address': values['address'], 'phone': values['phone'],
+             'department_id': values['department_id'], 'position': values['position'],
+             'annual_leave_days': values['annual_leave_days'], 'hire_date': hire_date}
+            for values in rows
+        ])
@@ -0,0 +1,142 @@
+import threading
+import time
+from flask import current_app, request, session
+from flask_login import UserMixin
+from sqlalchemy.orm import joinedload
+from app import db
+
+class LazyRecord:
+    """Attributs en cache ; tout autre attribut charge l'objet réel (une requête, au premier accès)"""
+
+    def __init__(self, fields, loader):
+        self.__dict__.update(fields)
+        self.__dict__['_loader'] = loader
+        self.__dict__['_record'] = None
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        record = self.__dict__['_record']
+        if record is None:
+            record = self.__dict__['_record'] = self._loader()
+        return getattr(record, name)
+
+class CachedIdentity(LazyRecord, UserMixin):
+    """Utilisateur reconstruit depuis le cache de session (rôle, identifiants, nom affiché)"""
+
+    @property
+    def is_active(self):
+        return self.__dict__['active']
+
+    @property
+    def is_admin(self):
+        return self.role == 'admin'
+
+    @property
+    def is_manager(self):
+        return self.role == 'manager'
+
+class IdentityCache:
+    """Chargement de l'utilisateur connecté et cache signé de son identité dans la session
+
+    Sans cache (IDENTITY_CACHE_TTL = 0), l'utilisateur, son employé et le
+    département sont chargés en une requête jointe. Avec cache, les pages en
+    lecture seule (GET) réutilisent pendant IDENTITY_CACHE_TTL secondes le
+    rôle et les identifiants stockés dans le cookie de session (signé) ;
+    l'employé n'est chargé que si un autre attribut que id / department_id
+    est utilisé. Une modification du compte invalide le cache immédiatement
+    dans ce processus, et au plus tard après IDENTITY_CACHE_TTL ailleurs.
+    """
+
+    SESSION_KEY = '_identity'
+
+    def __init__(self):
+        self._changed_at = {}  # user_id -> date de la dernière modification du compte (ordre chronologique)
+        self._lock = threading.Lock()
+
+    def load(self, user_id):
+        identity = self.cached(user_id)
+        if identity is not None:
+            return identity
+        user = self.load_user(user_id)
+        if user is not None:
+            self.store(user)
+        return user
+
+    def load_user(self, user_id):
+        """Utilisateur, employé et département en une seule requête"""
+        from app.models.user import User
+        from app.models.employee import Employee
+        return User.query.options(
+            joinedload(User.employee).joinedload(Employee.department)
+        ).filter(User.id == user_id).first()
+
+    def _ttl(self):
+        return current_app.config['IDENTITY_CACHE_TTL']
+
+    def _valid(self, data, user_id):
+        """Entrée de session de cet utilisateur, non expirée et postérieure à la dernière modification"""
+        if not data or data['user_id'] != user_id:
+            return False
+        with self._lock:
+            changed_at = self._changed_at.get(user_id, 0)
+        return changed_at < data['issued_at'] and data['issued_at'] + self._ttl() >= time.time()
+
+    def cached(self, user_id):
+        if self._ttl() <= 0 or request.method not in ('GET', 'HEAD'):
+            return None
+        data = session.get(self.SESSION_KEY)
+        if not self._valid(data, user_id):
+            return None
+
+        employee = None
+        if data['employee_id'] is not None:
+            from app.models.employee import Employee
+            employee_id = data['employee_id']
+            employee = LazyRecord(
+                {'id': employee_id, 'department_id': data['department_id']},
+                lambda: db.session.get(Employee, employee_id)
+            )
+        return CachedIdentity({
+            'id': user_id,
+            'role': data['role'],
+            'username': data['username'],
+            'email': data['email'],
+            'active': data['active'],
+            'employee': employee
+        }, lambda: self.load_user(user_id))
+
+    def store(self, user):
+        if self._ttl() <= 0:
+            return
+        if self._valid(session.get(self.SESSION_KEY), user.id):
+            return
+        employee = user.employee
+        session[self.SESSION_KEY] = {
+            'user_id': user.id,
+            'role': user.role,
+            'username': user.username,
+            'email': user.email,
+            'active': bool(user.is_active),
+            'employee_id': employee.id if employee else None,
+            'department_id': employee.department_id if employee else None,
+            'issued_at': time.time()
+        }
+
+    def invalidate(self, user_id):
+        """À appeler quand le compte (rôle, email, employé...) est modifié"""
+        now = time.time()
+        expired_before = now - self._ttl()
+        with self._lock:
+            self._changed_at.pop(user_id, None)
+            self._changed_at[user_id] = now
+            # Au-delà du TTL, les entrées de session antérieures ont expiré d'elles-mêmes
+            for changed_user_id, changed_at in list(self._changed_at.items()):
+                if changed_at >= expired_before:
+                    break
+                del self._changed_at[changed_user_id]
+        data = session.get(self.SESSION_KEY)
+        if data and data['user_id'] == user_id:
+            session.pop(self.SESSION_KEY, None)
+
+identity_cache = IdentityCache()
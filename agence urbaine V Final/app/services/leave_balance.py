@@ -0,0 +1,113 @@
+from datetime import datetime
+from sqlalchemy import func, and_
+from app.models.employee import Employee
+from app.models.leave import Leave
+from app.models.leave_ledger import LeaveLedger
+from app.services.business_calendar import get_calendar
+from app import db
+
+class LeaveBalanceService:
+    """Calcule les soldes de congés (en jours ouvrables) à partir du cumul leave_ledger"""
+
+    def calculate_balances(self, employee_ids=None, year=None):
+        """Retourne {employee_id: {'annual', 'taken', 'balance'}} pour les employés demandés
+
+        Si employee_ids vaut None, tous les employés sont calculés.
+        """
+        if year is None:
+            year = datetime.now().year
+        if employee_ids is not None:
+            employee_ids = list(employee_ids)
+            if not employee_ids:
+                return {}
+
+        taken = func.coalesce(func.sum(LeaveLedger.days_taken), 0)
+        query = db.session.query(
+            Employee.id,
+            Employee.annual_leave_days,
+            taken
+        ).outerjoin(LeaveLedger, and_(
+            LeaveLedger.employee_id == Employee.id,
+            LeaveLedger.year == year
+        )).group_by(Employee.id, Employee.annual_leave_days)
+
+        if employee_ids is not None:
+            query = query.filter(Employee.id.in_(employee_ids))
+
+        balances = {}
+        for employee_id, annual_leaves, total_taken in query:
+            total_taken = int(total_taken or 0)
+            balances[employee_id] = {
+                'annual': annual_leaves,
+                'taken': total_taken,
+                'balance': max(0, annual_leaves - total_taken)
+            }
+        return balances
+
+    def calculate_balance(self, employee, year=None):
+        """Calcule le solde de congés d'un seul employé"""
+        balance = self.calculate_balances([employee.id], year).get(employee.id)
+        if balance is None:
+            # Employé pas encore enregistré en base
+            annual_leaves = employee.annual_leave_days
+            balance = {'annual': annual_leaves, 'taken': 0, 'balance': max(0, annual_leaves)}
+        return balance
+
+    def compute_ledger_from_history(self):
+        """Recalcule le cumul à partir de la table leaves : {(employee_id, year, type): (pris, en attente)}
+
+        Les durées sont en jours ouvrables, selon le calendrier configuré.
+        """
+        rows = db.session.query(
+            Leave.employee_id,
+            Leave.leave_type,
+            Leave.status,
+            Leave.start_date,
+            Leave.end_date
+        ).filter(
+            Leave.status.in_(LeaveLedger.STATUS_COLUMNS)
+        ).yield_per(5000)
+        return self.aggregate_ledger(rows, get_calendar())
+
+    @staticmethod
+    def aggregate_ledger(rows, calendar):
+        """Cumul de lignes (employee_id, leave_type, status, start_date, end_date) de congés actifs"""
+        ledger = {}
+        for employee_id, leave_type, status, start_date, end_date in rows:
+            key = (employee_id, start_date.year, leave_type)
+            taken, pending = ledger.get(key, (0, 0))
+            days = calendar.count(start_date, end_date)
+            if status == 'approved':
+                taken += days
+            else:
+                pending += days
+            ledger[key] = (taken, pending)
+        return ledger
+
+    def rebuild_ledger(self):
+        """Reconstruit entièrement la table leave_ledger ; retourne le nombre de lignes écrites"""
+        ledger = self.compute_ledger_from_history()
+        LeaveLedger.query.delete()
+        db.session.bulk_insert_mappings(LeaveLedger, [
+            {'employee_id': employee_id, 'year': year, 'leave_type': leave_type,
+             'days_taken': taken, 'days_pending': pending}
+            for (employee_id, year, leave_type), (taken, pending) in ledger.items()
+        ])
+        db.session.commit()
+        return len(ledger)
+
+    def verify_ledger(self):
+        """Compare le cumul stocké à l'historique ; retourne la liste des écarts"""
+        expected = self.compute_ledger_from_history()
+        stored = {
+            (entry.employee_id, entry.year, entry.leave_type): (entry.days_taken, entry.days_pending)
+            for entry in LeaveLedger.query.all()
+        }
+
+        mismatches = []
+        for key in sorted(set(expected) | set(stored)):
+            expected_values = expected.get(key, (0, 0))
+            stored_values = stored.get(key, (0, 0))
+            if expected_values != stored_values:
+                mismatches.append((key, expected_values, stored_values))
+        return mismatches
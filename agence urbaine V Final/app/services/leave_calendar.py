@@ -0,0 +1,134 @@
+import calendar
+from datetime import date
+from flask import current_app
+from sqlalchemy import and_, event, inspect
+from sqlalchemy.orm import Session
+from app.models.employee import Employee
+from app.models.leave import Leave
+from app.services.business_calendar import get_calendar
+from app.services.cache import TTLCache
+from app import db
+
+def month_bounds(year, month):
+    """Premier et dernier jour du mois"""
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+def months_between(start, end):
+    """Mois (année, mois) couverts par [start, end]"""
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        yield year, month
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+def day_mask(first, last):
+    """Bits first à last inclus (bit 0 = 1er du mois)"""
+    return ((1 << (last - first + 1)) - 1) << first
+
+def decode_days(bits, days_in_month):
+    """Jours du mois (1 à 31) présents dans le bitset"""
+    return [day + 1 for day in range(days_in_month) if bits >> day & 1]
+
+class LeaveCalendarService:
+    """Grille mensuelle des absences d'un département (employé x jour)
+
+    Chaque employé a deux bitsets sur le mois (bit 0 = 1er du mois) : jours de
+    congé approuvé et jours de congé en attente. La grille est construite en
+    une requête (employés du département joints à leurs congés du mois) et
+    mise en cache par (département, année, mois) ; une écriture de congé
+    n'invalide que les mois qu'elle touche dans ce processus, les autres
+    processus attendent l'expiration (CALENDAR_CACHE_TTL, comme le tableau de bord).
+    """
+
+    def __init__(self):
+        self.cache = TTLCache()
+
+    def month_grid(self, department_id, year, month):
+        ttl = current_app.config['CALENDAR_CACHE_TTL']
+        return self.cache.get_or_set((department_id, year, month),
+                                     lambda: self.build_month_grid(department_id, year, month), ttl)
+
+    def build_month_grid(self, department_id, year, month):
+        first_day, last_day = month_bounds(year, month)
+        days_in_month = last_day.day
+
+        rows = db.session.query(
+            Employee.id,
+            Employee.first_name,
+            Employee.last_name,
+            Leave.start_date,
+            Leave.end_date,
+            Leave.status
+        ).outerjoin(Leave, and_(
+            Leave.employee_id == Employee.id,
+            Leave.status.in_(('approved', 'pending')),
+            Leave.start_date <= last_day,
+            Leave.end_date >= first_day
+        )).filter(
+            Employee.department_id == department_id
+        ).order_by(Employee.last_name, Employee.first_name, Employee.id)
+
+        employees = {}
+        for employee_id, first_name, last_name, start, end, status in rows:
+            entry = employees.setdefault(employee_id, [employee_id, first_name, last_name, 0, 0])
+            if start is None:
+                continue
+            mask = day_mask(max(start, first_day).day - 1, min(end, last_day).day - 1)
+            entry[3 if status == 'approved' else 4] |= mask
+
+        business_calendar = get_calendar()
+        non_working = 0
+        for day in range(days_in_month):
+            if not business_calendar.is_working_day(date(year, month, day + 1)):
+                non_working |= 1 << day
+
+        return {
+            'department_id': department_id,
+            'year': year,
+            'month': month,
+            'days_in_month': days_in_month,
+            'non_working': non_working,
+            'employees': [
+                {'id': employee_id, 'first_name': first_name, 'last_name': last_name,
+                 'approved': approved, 'pending': pending}
+                for employee_id, first_name, last_name, approved, pending in employees.values()
+            ]
+        }
+
+    def invalidate_months(self, months):
+        months = set(months)
+        self.cache.invalidate_where(lambda key: key[1:] in months)
+
+leave_calendar = LeaveCalendarService()
+
+# Invalidation après commit : mois touchés par les congés modifiés, ou tout le
+# cache si un employé change (département, nom, ajout, suppression)
+def _touched_months(leave):
+    state = inspect(leave)
+    dates = [leave.start_date, leave.end_date]
+    for attribute in ('start_date', 'end_date'):
+        dates.extend(state.attrs[attribute].history.deleted)
+    dates = [day for day in dates if day is not None]
+    return set(months_between(min(dates), max(dates))) if dates else set()
+
+@event.listens_for(Session, 'after_flush')
+def _collect_calendar_changes(session, flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Employee):
+            session.info['leave_calendar_months'] = None
+        elif isinstance(obj, Leave):
+            months = session.info.setdefault('leave_calendar_months', set())
+            if months is not None:
+                months.update(_touched_months(obj))
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_calendar(session):
+    if 'leave_calendar_months' in session.info:
+        months = session.info.pop('leave_calendar_months')
+        if months is None:
+            leave_calendar.cache.invalidate()
+        else:
+            leave_calendar.invalidate_months(months)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_calendar_changes(session):
+    session.info.pop('leave_calendar_months', None)
@@ -0,0 +1,214 @@
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from datetime import date, datetime, timedelta
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.models.leave import Leave
+from app import db
+
+# Statuts pris en compte : un congé rejeté ne bloque rien
+ACTIVE_STATUSES = ('approved', 'pending')
+
+class LeaveIntervalIndex:
+    """Index mémoire des congés approuvés et en attente (intervalles de dates)
+
+    Les congés sont triés par date de début ; comme la durée d'un congé est
+    bornée (max_length), une recherche sur [a, b] ne parcourt que les congés
+    commençant entre a - max_length et b. L'index ne couvre que les congés
+    finissant après l'horizon (aujourd'hui - LEAVE_INDEX_HISTORY_DAYS) : les
+    requêtes plus anciennes sont faites en base.
+
+    Chaque processus tient son propre index : il est mis à jour directement
+    après les commits locaux, et par relecture des congés modifiés
+    (updated_at) pour les écritures des autres processus. Une suppression ne
+    laisse pas de updated_at : chaque relecture retire aussi les congés qui ne
+    sont plus actifs en base (suppressions en masse, autres processus).
+    """
+
+    # Marge de relecture pour les transactions validées avec un updated_at antérieur
+    REFRESH_OVERLAP = timedelta(seconds=60)
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._entries = []       # (start, id, end, employee_id, status), trié
+        self._by_id = {}         # id -> entrée
+        self._by_employee = {}   # employee_id -> liste triée d'entrées
+        self._max_length = timedelta(0)
+        self._horizon = None
+        self._watermark = None
+        self._last_refresh = 0.0
+        self._last_full_load = 0.0
+
+    # --- Chargement et mise à jour ---
+
+    def ensure_fresh(self):
+        config = current_app.config
+        now = time.monotonic()
+        with self._lock:
+            if not self._loaded or now - self._last_full_load > config['LEAVE_INDEX_RELOAD_SECONDS']:
+                self._load_all()
+            elif now - self._last_refresh > config['LEAVE_INDEX_REFRESH_SECONDS']:
+                self._refresh()
+
+    def _load_all(self):
+        self._entries = []
+        self._by_id = {}
+        self._by_employee = {}
+        self._max_length = timedelta(0)
+        self._horizon = date.today() - timedelta(days=current_app.config['LEAVE_INDEX_HISTORY_DAYS'])
+        self._watermark = datetime.utcnow()
+
+        rows = db.session.query(
+            Leave.id, Leave.employee_id, Leave.start_date, Leave.end_date, Leave.status, Leave.updated_at
+        ).filter(
+            Leave.status.in_(ACTIVE_STATUSES),
+            Leave.end_date >= self._horizon
+        )
+        for leave_id, employee_id, start, end, status, updated_at in rows:
+            self._insert((start, leave_id, end, employee_id, status))
+            self._advance_watermark(updated_at)
+
+        now = time.monotonic()
+        self._loaded = True
+        self._last_full_load = now
+        self._last_refresh = now
+
+    def _refresh(self):
+        """Relit les congés modifiés depuis le dernier chargement (autres processus)"""
+        query = db.session.query(
+            Leave.id, Leave.employee_id, Leave.start_date, Leave.end_date, Leave.status, Leave.updated_at
+        )
+        if self._watermark is not None:
+            query = query.filter(Leave.updated_at >= self._watermark - self.REFRESH_OVERLAP)
+        for leave_id, employee_id, start, end, status, updated_at in query:
+            self._upsert(leave_id, employee_id, start, end, status)
+            self._advance_watermark(updated_at)
+        self._drop_missing()
+        self._last_refresh = time.monotonic()
+
+    def _drop_missing(self):
+        """Retire les congés indexés supprimés (ou sortis de l'horizon) en base"""
+        live = {leave_id for leave_id, in db.session.query(Leave.id).filter(
+            Leave.status.in_(ACTIVE_STATUSES),
+            Leave.end_date >= self._horizon
+        )}
+        for leave_id in [leave_id for leave_id in self._by_id if leave_id not in live]:
+            self._remove(leave_id)
+
+    def _advance_watermark(self, updated_at):
+        if updated_at is not None and (self._watermark is None or updated_at > self._watermark):
+            self._watermark = updated_at
+
+    def _insert(self, entry):
+        start, leave_id, end, employee_id, status = entry
+        insort(self._entries, entry)
+        insort(self._by_employee.setdefault(employee_id, []), entry)
+        self._by_id[leave_id] = entry
+        self._max_length = max(self._max_length, end - start)
+
+    def _remove(self, leave_id):
+        entry = self._by_id.pop(leave_id, None)
+        if entry is None:
+            return
+        for entries in (self._entries, self._by_employee.get(entry[3], [])):
+            index = bisect_left(entries, entry)
+            if index < len(entries) and entries[index] == entry:
+                del entries[index]
+
+    def _upsert(self, leave_id, employee_id, start, end, status):
+        self._remove(leave_id)
+        if status in ACTIVE_STATUSES and self._horizon is not None and end >= self._horizon:
+            self._insert((start, leave_id, end, employee_id, status))
+
+    def apply(self, changes):
+        """Applique des changements locaux validés : [(id, employee_id, start, end, status ou None)]"""
+        with self._lock:
+            if not self._loaded:
+                return
+            for leave_id, employee_id, start, end, status in changes:
+                self._upsert(leave_id, employee_id, start, end, status)
+
+    def remove_employee(self, employee_id):
+        with self._lock:
+            for entry in list(self._by_employee.pop(employee_id, [])):
+                self._remove(entry[1])
+
+    # --- Requêtes ---
+
+    def _covers(self, start):
+        return self._horizon is not None and start >= self._horizon
+
+    def overlapping(self, employee_id, start, end, exclude_id=None):
+        """Congés actifs de l'employé chevauchant [start, end] : liste de (id, start, end, status)"""
+        self.ensure_fresh()
+        with self._lock:
+            if self._covers(start):
+                return [
+                    (leave_id, leave_start, leave_end, status)
+                    for leave_start, leave_id, leave_end, _, status in self._by_employee.get(employee_id, [])
+                    if leave_start <= end and leave_end >= start and leave_id != exclude_id
+                ]
+        return self.overlapping_in_database(employee_id, start, end, exclude_id)
+
+    def overlapping_in_database(self, employee_id, start, end, exclude_id=None):
+        """Même résultat que overlapping(), lu en base dans la transaction courante"""
+        query = db.session.query(Leave.id, Leave.start_date, Leave.end_date, Leave.status).filter(
+            Leave.employee_id == employee_id,
+            Leave.status.in_(ACTIVE_STATUSES),
+            Leave.start_date <= end,
+            Leave.end_date >= start
+        )
+        if exclude_id is not None:
+            query = query.filter(Leave.id != exclude_id)
+        return [tuple(row) for row in query.order_by(Leave.start_date)]
+
+    def absences_in_range(self, start, end, statuses=ACTIVE_STATUSES):
+        """Congés chevauchant [start, end] : liste de (id, employee_id, start, end, status)"""
+        self.ensure_fresh()
+        with self._lock:
+            if self._covers(start):
+                low = bisect_left(self._entries, (start - self._max_length,))
+                high = bisect_right(self._entries, (end, float('inf')))
+                return [
+                    (leave_id, employee_id, leave_start, leave_end, status)
+                    for leave_start, leave_id, leave_end, employee_id, status in self._entries[low:high]
+                    if leave_end >= start and status in statuses
+                ]
+        query = db.session.query(
+            Leave.id, Leave.employee_id, Leave.start_date, Leave.end_date, Leave.status
+        ).filter(
+            Leave.status.in_(statuses),
+            Leave.start_date <= end,
+            Leave.end_date >= start
+        )
+        return [tuple(row) for row in query]
+
+    def absent_on(self, day, statuses=('approved',)):
+        """Congés en cours le jour donné (par défaut uniquement les congés approuvés)"""
+        return self.absences_in_range(day, day, statuses)
+
+leave_index = LeaveIntervalIndex()
+
+# Mise à jour de l'index après chaque commit local touchant des congés
+@event.listens_for(Session, 'after_flush')
+def _collect_leave_changes(session, flush_context):
+    changes = session.info.setdefault('leave_index_changes', [])
+    for obj in (*session.new, *session.dirty):
+        if isinstance(obj, Leave):
+            changes.append((obj.id, obj.employee_id, obj.start_date, obj.end_date, obj.status))
+    for obj in session.deleted:
+        if isinstance(obj, Leave):
+            changes.append((obj.id, obj.employee_id, obj.start_date, obj.end_date, None))
+
+@event.listens_for(Session, 'after_commit')
+def _apply_leave_changes(session):
+    changes = session.info.pop('leave_index_changes', None)
+    if changes:
+        leave_index.apply(changes)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_leave_changes(session):
+    session.info.pop('leave_index_changes', None)
@@ -0,0 +1,174 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+from sqlalchemy import case, delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from app import db
+
+def _roll(window, entry_window, previous_count, current_count):
+    """Décale les compteurs (précédente, courante) vers la fenêtre donnée"""
+    if entry_window == window:
+        return previous_count, current_count
+    if entry_window == window - 1:
+        return current_count, 0
+    return 0, 0
+
+class MemoryThrottleBackend:
+    """Compteurs en mémoire du processus, taille bornée avec éviction LRU"""
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._entries = OrderedDict()  # clé -> [fenêtre, compte précédent, compte courant]
+        self._lock = threading.Lock()
+
+    def counts(self, key, window):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return 0, 0
+            return _roll(window, *entry)
+
+    def hit(self, key, window):
+        with self._lock:
+            entry = self._entries.get(key)
+            previous_count, current_count = _roll(window, *entry) if entry else (0, 0)
+            self._entries[key] = [window, previous_count, current_count + 1]
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_keys:
+                self._entries.popitem(last=False)
+
+    def reset(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+class DatabaseThrottleBackend:
+    """Compteurs dans la table login_throttle, partagés par tous les workers
+
+    Les écritures passent par une connexion séparée pour ne pas dépendre de la
+    transaction de la requête ; les fenêtres expirées sont purgées de temps en temps.
+    """
+
+    PURGE_EVERY = 500
+
+    def __init__(self):
+        self._hits = 0
+
+    def counts(self, key, window):
+        from app.models.login_throttle import LoginThrottleEntry as Entry
+        with db.engine.connect() as connection:
+            row = connection.execute(
+                select(Entry.window_start, Entry.previous_count, Entry.current_count).where(Entry.key == key)
+            ).first()
+        return _roll(window, *row) if row else (0, 0)
+
+    def hit(self, key, window):
+        from app.models.login_throttle import LoginThrottleEntry as Entry
+        # Incrément relatif, décalage des fenêtres calculé en SQL : les échecs
+        # simultanés de plusieurs workers s'additionnent au lieu de s'écraser.
+        # Ordre des affectations imposé (MySQL les évalue de gauche à droite).
+        roll = update(Entry).where(Entry.key == key).ordered_values(
+            (Entry.previous_count, case(
+                (Entry.window_start == window, Entry.previous_count),
+                (Entry.window_start == window - 1, Entry.current_count),
+                else_=0
+            )),
+            (Entry.current_count, case(
+                (Entry.window_start == window, Entry.current_count + 1),
+                else_=1
+            )),
+            (Entry.window_start, window)
+        )
+        with db.engine.begin() as connection:
+            recorded = connection.execute(roll).rowcount > 0
+        if not recorded:
+            try:
+                with db.engine.begin() as connection:
+                    connection.execute(insert(Entry).values(
+                        key=key, window_start=window, previous_count=0, current_count=1))
+            except IntegrityError:
+                # Ligne créée entre-temps par un autre worker : l'échec lui est ajouté
+                with db.engine.begin() as connection:
+                    connection.execute(roll)
+
+        self._hits += 1
+        if self._hits % self.PURGE_EVERY == 0:
+            with db.engine.begin() as connection:
+                connection.execute(delete(Entry).where(Entry.window_start < window - 1))
+
+    def reset(self, key):
+        from app.models.login_throttle import LoginThrottleEntry as Entry
+        with db.engine.begin() as connection:
+            connection.execute(delete(Entry).where(Entry.key == key))
+
+BACKENDS = {
+    'memory': lambda config: MemoryThrottleBackend(config['LOGIN_THROTTLE_MAX_KEYS']),
+    'database': lambda config: DatabaseThrottleBackend()
+}
+
+class LoginThrottle:
+    """Limitation des échecs de connexion par adresse IP et par email
+
+    Fenêtre glissante approchée : le compte d'échecs est celui de la fenêtre
+    courante plus celui de la précédente, pondéré par la part de cette
+    dernière encore couverte. Une tentative bloquée est refusée avant toute
+    requête sur les utilisateurs et tout calcul d'empreinte.
+    """
+
+    def __init__(self):
+        self._backend = None
+        self._lock = threading.Lock()
+
+    @property
+    def backend(self):
+        with self._lock:
+            if self._backend is None:
+                config = current_app.config
+                self._backend = BACKENDS[config['LOGIN_THROTTLE_BACKEND']](config)
+            return self._backend
+
+    def _keys(self, ip, email):
+        config = current_app.config
+        keys = []
+        if ip and config['LOGIN_THROTTLE_IP_LIMIT'] > 0:
+            keys.append((f'ip:{ip}', config['LOGIN_THROTTLE_IP_LIMIT']))
+        if email:
+            keys.append((f'email:{email.strip().lower()}', config['LOGIN_THROTTLE_EMAIL_LIMIT']))
+        return keys
+
+    def retry_after(self, ip, email, now=None):
+        """Secondes à attendre avant une nouvelle tentative (0 si autorisée)"""
+        period = current_app.config['LOGIN_THROTTLE_WINDOW']
+        now = time.time() if now is None else now
+        window, elapsed = divmod(now, period)
+        window = int(window)
+        weight = 1 - elapsed / period
+
+        wait = 0
+        for key, limit in self._keys(ip, email):
+            previous_count, current_count = self.backend.counts(key, window)
+            if previous_count * weight + current_count < limit:
+                continue
+            if current_count >= limit:
+                # Bloqué jusqu'à la fin de la fenêtre courante (puis pondération)
+                wait = max(wait, period - elapsed, 1)
+            else:
+                # Attendre que le poids de la fenêtre précédente suffise à repasser sous la limite
+                needed_weight = (limit - current_count) / previous_count
+                wait = max(wait, (weight - needed_weight) * period, 1)
+        return math.ceil(wait)
+
+    def register_failure(self, ip, email, now=None):
+        period = current_app.config['LOGIN_THROTTLE_WINDOW']
+        window = int((time.time() if now is None else now) // period)
+        for key, _ in self._keys(ip, email):
+            self.backend.hit(key, window)
+
+    def register_success(self, ip, email):
+        # Seul le compteur de l'email est remis à zéro : une IP reste surveillée
+        for key, _ in self._keys(ip, email):
+            if key.startswith('email:'):
+                self.backend.reset(key)
+
+login_throttle = LoginThrottle()
@@ -0,0 +1,387 @@
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from flask import current_app, g, request, request_finished, request_started
+from app.services.processes import process_alive
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+def _label_key(labelnames, labels):
+    return tuple(str(labels.get(name, '')) for name in labelnames)
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(labelnames, key, extra=None):
+    pairs = list(zip(labelnames, key)) + list((extra or {}).items())
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return str(value) if isinstance(value, int) else repr(float(value))
+
+class Counter:
+    """Compteur monotone, par combinaison d'étiquettes"""
+
+    type = 'counter'
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+class Gauge(Counter):
+    """Valeur instantanée (dernière valeur fixée par ce processus)"""
+
+    type = 'gauge'
+
+    def set(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = value
+
+class Histogram:
+    """Distribution de durées par intervalles cumulés (format Prometheus)"""
+
+    type = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}  # étiquettes -> [effectif par intervalle..., somme, nombre]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            entry[index] += 1
+            entry[-2] += value
+            entry[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self):
+        with self._lock:
+            return [[list(key), list(entry)] for key, entry in self._values.items()]
+
+class MetricsRegistry:
+    """Métriques de l'application au format texte Prometheus, sans service externe
+
+    Chaque processus compte en mémoire (un verrou court par métrique) et
+    écrit régulièrement son état dans METRICS_DIR (un fichier JSON par
+    processus, remplacé atomiquement). /metrics additionne les fichiers de
+    tous les processus : compteurs et histogrammes sont sommés, les jauges
+    sont exposées par processus (étiquette pid) tant que leur fichier est
+    récent. Les collecteurs (état des pools...) sont appelés avant chaque
+    écriture. À chaque export, les compteurs et histogrammes des processus
+    arrêtés sont ajoutés à AGGREGATE_FILE et leurs fichiers supprimés : les
+    totaux restent exacts sans que le dossier grossisse à chaque redémarrage.
+    Le dossier est propre à une machine (pid des processus).
+    """
+
+    FILE_PREFIX = 'metrics_'
+    AGGREGATE_FILE = 'aggregate.json'
+    LOCK_FILE = 'aggregate.lock'
+    LOCK_STALE_SECONDS = 60
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self.directory = None
+        self.flush_seconds = 5
+        self._last_flush = 0.0
+        self._flush_lock = threading.Lock()
+
+    def _register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=()):
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def collector(self, function):
+        """Décorateur : function(app) met à jour des jauges avant chaque export"""
+        self._collectors.append(function)
+        return function
+
+    def init_app(self, app):
+        self.directory = app.config.get('METRICS_DIR') or os.path.join(app.instance_path, 'metrics')
+        self.flush_seconds = app.config['METRICS_FLUSH_SECONDS']
+        os.makedirs(self.directory, exist_ok=True)
+        request_started.connect(_request_started, app, weak=False)
+        request_finished.connect(_request_finished, app, weak=False)
+        app.after_request(self._flush_periodically)
+
+    def snapshot(self, app):
+        for collect in self._collectors:
+            collect(app)
+        return {
+            'pid': os.getpid(),
+            'written_at': time.time(),
+            'metrics': {name: metric.samples() for name, metric in self._metrics.items()}
+        }
+
+    def flush(self, app):
+        """Écrit l'état de ce processus dans METRICS_DIR"""
+        data = self.snapshot(app)
+        self._write_json(f'{self.FILE_PREFIX}{data["pid"]}.json', data)
+        self._last_flush = time.monotonic()
+        return data
+
+    def _flush_periodically(self, response):
+        if time.monotonic() - self._last_flush >= self.flush_seconds and self._flush_lock.acquire(blocking=False):
+            try:
+                self.flush(current_app._get_current_object())
+            except OSError:
+                pass  # Les métriques ne doivent jamais faire échouer une requête
+            finally:
+                self._flush_lock.release()
+        return response
+
+    def _file_pid(self, filename):
+        """pid d'un fichier de processus, None pour tout autre fichier"""
+        if not filename.startswith(self.FILE_PREFIX) or not filename.endswith('.json'):
+            return None
+        pid = filename[len(self.FILE_PREFIX):-len('.json')]
+        return int(pid) if pid.isdigit() else None
+
+    def _read_json(self, filename):
+        try:
+            with open(os.path.join(self.directory, filename), encoding='utf-8') as source:
+                return json.load(source)
+        except (OSError, ValueError):
+            return None
+
+    def _write_json(self, filename, data):
+        path = os.path.join(self.directory, filename)
+        temporary = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temporary, 'w', encoding='utf-8') as output:
+            json.dump(data, output)
+        os.replace(temporary, path)
+
+    def _read_aggregate(self):
+        # Les jauges n'y figurent pas ; written_at à 0 : jamais considéré comme récent
+        aggregate = self._read_json(self.AGGREGATE_FILE) or {}
+        return {'pid': 'aggregate', 'written_at': 0, 'pids': aggregate.get('pids', []),
+                'metrics': aggregate.get('metrics', {})}
+
+    def _acquire_lock(self):
+        """Verrou entre processus (création exclusive d'un fichier), repris s'il est abandonné"""
+        path = os.path.join(self.directory, self.LOCK_FILE)
+        for _ in range(2):
+            try:
+                os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return True
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(path) < self.LOCK_STALE_SECONDS:
+                        return False
+                    os.remove(path)
+                except OSError:
+                    return False
+        return False
+
+    def _merge(self, totals, metrics):
+        """Ajoute les compteurs et histogrammes d'un instantané à totals (format des fichiers)"""
+        for name, samples in metrics.items():
+            metric = self._metrics.get(name)
+            if metric is None or metric.type == 'gauge':
+                continue
+            merged = {tuple(key): value for key, value in totals.get(name, [])}
+            for key, value in samples:
+                key = tuple(key)
+                if key not in merged:
+                    merged[key] = value
+                elif metric.type == 'counter':
+                    merged[key] += value
+                else:
+                    merged[key] = [a + b for a, b in zip(merged[key], value)]
+            totals[name] = [[list(key), value] for key, value in merged.items()]
+
+    def fold_dead_processes(self):
+        """Ajoute les fichiers des processus arrêtés à AGGREGATE_FILE puis les supprime
+
+        Pendant le regroupement, le fichier agrégé liste les pid déjà ajoutés :
+        un export concurrent ignore leurs fichiers pas encore supprimés.
+        """
+        own_pid = os.getpid()
+        dead = {}
+        for filename in os.listdir(self.directory):
+            pid = self._file_pid(filename)
+            if pid is not None and pid != own_pid and not process_alive(pid):
+                dead[pid] = filename
+        if not dead or not self._acquire_lock():
+            return 0
+        try:
+            aggregate = self._read_aggregate()
+            folded = set(aggregate['pids'])
+            for pid, filename in dead.items():
+                if pid in folded:
+                    continue
+                snapshot = self._read_json(filename)
+                if snapshot is not None:
+                    self._merge(aggregate['metrics'], snapshot['metrics'])
+                    folded.add(pid)
+            self._write_json(self.AGGREGATE_FILE, {'pids': sorted(folded), 'metrics': aggregate['metrics']})
+            for pid in folded:
+                try:
+                    os.remove(os.path.join(self.directory, f'{self.FILE_PREFIX}{pid}.json'))
+                except FileNotFoundError:
+                    pass
+            # Fichiers supprimés : un futur processus peut réutiliser ces pid
+            self._write_json(self.AGGREGATE_FILE, {'pids': [], 'metrics': aggregate['metrics']})
+            return len(dead)
+        finally:
+            try:
+                os.remove(os.path.join(self.directory, self.LOCK_FILE))
+            except OSError:
+                pass
+
+    def _read_all(self, app):
+        own = self.flush(app)
+        try:
+            self.fold_dead_processes()
+        except OSError:
+            pass  # Regroupement retenté au prochain export
+        aggregate = self._read_aggregate()
+        folded = set(aggregate['pids'])
+        snapshots = [own, aggregate]
+        for filename in os.listdir(self.directory):
+            pid = self._file_pid(filename)
+            if pid is None or pid == own['pid'] or pid in folded:
+                continue
+            snapshot = self._read_json(filename)
+            if snapshot is not None:
+                snapshots.append(snapshot)
+        return snapshots
+
+    def render(self, app):
+        """Texte d'exposition Prometheus, tous processus confondus"""
+        snapshots = self._read_all(app)
+        fresh_after = time.time() - 3 * max(self.flush_seconds, 1)
+        lines = []
+        for name, metric in self._metrics.items():
+            lines.append(f'# HELP {name} {metric.help}')
+            lines.append(f'# TYPE {name} {metric.type}')
+            if metric.type == 'gauge':
+                for snapshot in snapshots:
+                    if snapshot is not snapshots[0] and snapshot['written_at'] < fresh_after:
+                        continue  # processus arrêté ou inactif
+                    for key, value in snapshot['metrics'].get(name, []):
+                        lines.append(f'{name}{_format_labels(metric.labelnames, key, {"pid": str(snapshot["pid"])})} {_format_value(value)}')
+                continue
+
+            totals = {}
+            for snapshot in snapshots:
+                for key, value in snapshot['metrics'].get(name, []):
+                    key = tuple(key)
+                    if metric.type == 'counter':
+                        totals[key] = totals.get(key, 0) + value
+                    else:
+                        current = totals.setdefault(key, [0] * len(value))
+                        totals[key] = [a + b for a, b in zip(current, value)]
+
+            for key, value in sorted(totals.items()):
+                if metric.type == 'counter':
+                    lines.append(f'{name}{_format_labels(metric.labelnames, key)} {_format_value(value)}')
+                    continue
+                cumulative = 0
+                for bound, count in zip(metric.buckets + (math.inf,), value[:-2]):
+                    cumulative += count
+                    labels = _format_labels(metric.labelnames, key, {'le': _format_value(bound)})
+                    lines.append(f'{name}_bucket{labels} {cumulative}')
+                lines.append(f'{name}_sum{_format_labels(metric.labelnames, key)} {_format_value(value[-2])}')
+                lines.append(f'{name}_count{_format_labels(metric.labelnames, key)} {_format_value(value[-1])}')
+        return '\n'.join(lines) + '\n'
+
+metrics = MetricsRegistry()
+
+request_duration = metrics.histogram(
+    'http_request_duration_seconds', 'Durée des requêtes HTTP par blueprint', ('blueprint', 'method'))
+requests_total = metrics.counter(
+    'http_requests_total', 'Requêtes HTTP par blueprint et code de réponse', ('blueprint', 'status'))
+leave_submissions = metrics.counter(
+    'leave_submissions_total', 'Demandes de congé soumises', ('leave_type',))
+leave_decisions = metrics.counter(
+    'leave_decisions_total', 'Décisions sur les demandes de congé', ('decision',))
+pdf_render_duration = metrics.histogram(
+    'pdf_render_duration_seconds', 'Durée de génération des rapports PDF', ('report',),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120))
+pdf_cache_requests = metrics.counter(
+    'pdf_cache_requests_total', 'Rapports PDF individuels servis depuis le cache ou générés', ('result',))
+exports_total = metrics.counter(
+    'exports_total', 'Exports tabulaires (CSV/XLSX)', ('dataset', 'format'))
+pool_checked_out = metrics.gauge(
+    'db_pool_checked_out', 'Connexions empruntées au pool', ('bind',))
+pool_capacity = metrics.gauge(
+    'db_pool_capacity', 'Connexions maximales du pool (taille + débordement)', ('bind',))
+pool_saturation = metrics.gauge(
+    'db_pool_saturation_ratio', 'Part des connexions du pool empruntées (0 à 1)', ('bind',))
+pool_checkouts = metrics.gauge(
+    'db_pool_checkouts', 'Emprunts de connexions depuis le démarrage du processus', ('bind',))
+pool_timeouts = metrics.gauge(
+    'db_pool_timeouts', 'Emprunts abandonnés (délai dépassé) depuis le démarrage du processus', ('bind',))
+
+@metrics.collector
+def _collect_pools(app):
+    from app import db
+    from app.services.db_pool import pool_status
+    with app.app_context():
+        engines = dict(db.engines)
+    for bind, engine in engines.items():
+        status = pool_status(engine)
+        bind = bind or 'default'
+        if 'size' in status:
+            capacity = status['size'] + max(0, status['max_overflow'])
+            pool_checked_out.set(status['checked_out'], bind=bind)
+            pool_capacity.set(capacity, bind=bind)
+            pool_saturation.set(round(status['checked_out'] / capacity, 4) if capacity else 0, bind=bind)
+        if 'checkouts' in status:
+            pool_checkouts.set(status['checkouts'], bind=bind)
+            pool_timeouts.set(status['timeouts'], bind=bind)
+
+def _request_started(sender, **extra):
+    g._metrics_started = time.perf_counter()
+
+def _request_finished(sender, response, **extra):
+    started = g.pop('_metrics_started', None)
+    if started is None:
+        return
+    blueprint = request.blueprint or 'app'
+    request_duration.observe(time.perf_counter() - started, blueprint=blueprint, method=request.method)
+    requests_total.inc(blueprint=blueprint, status=response.status_code)
@@ -0,0 +1,83 @@
+import hmac
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, has_app_context
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Préfixes des empreintes werkzeug ; toute autre valeur est un ancien mot de passe en clair
+HASH_PREFIXES = ('scrypt:', 'pbkdf2:')
+DEFAULT_METHOD = 'scrypt:32768:8:1'
+
+class PasswordVerificationBusy(RuntimeError):
+    """Trop de vérifications de mot de passe en cours : réessayer plus tard"""
+
+class PasswordHasher:
+    """Empreintes de mots de passe (werkzeug scrypt/pbkdf2, paramètres configurables)
+
+    La vérification indique aussi si l'empreinte doit être recalculée : mot de
+    passe encore stocké en clair, ou paramètres différents de
+    PASSWORD_HASH_METHOD. Le nombre de vérifications simultanées est limité
+    (PASSWORD_VERIFY_CONCURRENCY) pour que le calcul, volontairement coûteux,
+    n'accapare pas tous les workers lors d'un afflux de connexions.
+    """
+
+    def __init__(self):
+        self._slots = None
+        self._slots_lock = threading.Lock()
+
+    def _config(self, key, default):
+        return current_app.config.get(key, default) if has_app_context() else default
+
+    @property
+    def method(self):
+        return self._config('PASSWORD_HASH_METHOD', DEFAULT_METHOD)
+
+    def _get_slots(self):
+        with self._slots_lock:
+            if self._slots is None:
+                self._slots = threading.BoundedSemaphore(self._config('PASSWORD_VERIFY_CONCURRENCY', 2))
+            return self._slots
+
+    @staticmethod
+    def is_hashed(stored):
+        return bool(stored) and stored.startswith(HASH_PREFIXES) and '$' in stored
+
+    def hash(self, password):
+        return generate_password_hash(password, method=self.method)
+
+    def hash_many(self, passwords, workers=None):
+        """Empreintes d'une liste de mots de passe (le calcul scrypt libère le GIL)"""
+        passwords = list(passwords)
+        if len(passwords) < 2:
+            return [self.hash(password) for password in passwords]
+        method = self.method
+        with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+            return list(executor.map(lambda password: generate_password_hash(password, method=method), passwords))
+
+    def needs_rehash(self, stored):
+        return not self.is_hashed(stored) or stored.split('$', 1)[0] != self.method
+
+    def verify(self, stored, password):
+        """Retourne (mot de passe correct, empreinte à recalculer)
+
+        Lève PasswordVerificationBusy si aucune place ne se libère avant
+        PASSWORD_VERIFY_TIMEOUT secondes.
+        """
+        if not stored or password is None:
+            return False, False
+        if not self.is_hashed(stored):
+            # Ancien stockage en clair : comparaison à temps constant
+            valid = hmac.compare_digest(stored.encode('utf-8'), password.encode('utf-8'))
+            return valid, valid
+
+        slots = self._get_slots()
+        if not slots.acquire(timeout=self._config('PASSWORD_VERIFY_TIMEOUT', 5)):
+            raise PasswordVerificationBusy('Trop de connexions simultanées, veuillez réessayer')
+        try:
+            valid = check_password_hash(stored, password)
+        finally:
+            slots.release()
+        return valid, valid and self.needs_rehash(stored)
+
+password_hasher = PasswordHasher()
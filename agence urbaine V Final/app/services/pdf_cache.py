@@ -0,0 +1,67 @@
+import os
+import threading
+import uuid
+
+class PDFCache:
+    """Stockage disque des PDF générés, adressé par empreinte de contenu
+
+    Le nombre de fichiers est borné : les moins récemment utilisés (date de
+    modification, rafraîchie à chaque lecture) sont supprimés en premier.
+    """
+
+    def __init__(self, directory, max_entries=500):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path_for(self, key):
+        return os.path.join(self.directory, f'{key}.pdf')
+
+    def get(self, key):
+        """Retourne le chemin du PDF en cache, ou None"""
+        path = self.path_for(key)
+        try:
+            os.utime(path)  # marque l'entrée comme récemment utilisée
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key, data):
+        """Enregistre le PDF (bytes) et retourne son chemin"""
+        path = self.path_for(key)
+        temp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(temp_path, 'wb') as output:
+            output.write(data)
+        os.replace(temp_path, path)  # écriture atomique
+        self.evict()
+        return path
+
+    def evict(self):
+        with self._lock:
+            entries = []
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith('.pdf'):
+                    try:
+                        entries.append((entry.stat().st_mtime, entry.path))
+                    except FileNotFoundError:
+                        continue
+            if len(entries) <= self.max_entries:
+                return
+            entries.sort()
+            for _, path in entries[:len(entries) - self.max_entries]:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+def get_pdf_cache(app):
+    """Cache PDF de l'application (un par dossier configuré)"""
+    directory = app.config.get('PDF_CACHE_DIR') or os.path.join(app.instance_path, 'pdf_cache')
+    with _caches_lock:
+        if directory not in _caches:
+            _caches[directory] = PDFCache(directory, app.config['PDF_CACHE_MAX_ENTRIES'])
+        return _caches[directory]
@@ -1,92 +1,122 @@
 from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib import colors
-from reportlab.lib.enums import TA_CENTER, TA_LEFT
-from datetime import datetime
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+from datetime import date, datetime
 from io import BytesIO
+import hashlib
+import json
+import multiprocessing
+import sqlite3
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
 from app.models.employee import Employee
 from app.models.leave import Leave
 from app.models.department import Department
+from app.services.business_calendar import get_calendar
+from app.services.leave_balance import LeaveBalanceService
+from app.services.pdf_templates import report_templates
+from app.services.read_replica import use_replica
 from app import db
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import aliased, joinedload
+
+def supports_window_functions(bind):
+    """ROW_NUMBER() OVER (...) disponible : MySQL 8.0+, MariaDB 10.2+, SQLite 3.25+"""
+    dialect = bind.dialect
+    if dialect.name == 'mysql':
+        version = dialect.server_version_info or ()
+        return version >= ((10, 2) if dialect.is_mariadb else (8, 0))
+    if dialect.name == 'sqlite':
+        return sqlite3.sqlite_version_info >= (3, 25)
+    return True
+
+class LazyStory(list):
+    """Liste de flowables alimentée à la demande par un générateur
+    
+    SimpleDocTemplate.build consomme la liste par le début et appelle len()
+    avant chaque élément : on ne garde ainsi qu'une petite fenêtre en mémoire.
+    """
+    LOOKAHEAD = 50
+    
+    def __init__(self, flowables):
+        super().__init__()
+        self._pending = iter(flowables)
+    
+    def __len__(self):
+        while self._pending is not None and super().__len__() < self.LOOKAHEAD:
+            try:
+                self.append(next(self._pending))
+            except StopIteration:
+                self._pending = None
+        return super().__len__()
 
 class PDFExportService:
-    def __init__(self):
-        self.styles = getSampleStyleSheet()
-        self.setup_custom_styles()
+    # Nombre d'employés chargés (et de soldes calculés) par lot dans le rapport global
+    BATCH_SIZE = 200
+    # À incrémenter à chaque modification de la mise en page des rapports (invalide le cache PDF)
+    TEMPLATE_VERSION = 3
     
-    def setup_custom_styles(self):
-        """Configure les styles personnalisés pour le PDF"""
-        # Style pour le titre principal
-        self.styles.add(ParagraphStyle(
-            name='CustomTitle',
-            parent=self.styles['Heading1'],
-            fontSize=18,
-            spaceAfter=30,
-            alignment=TA_CENTER,
-            textColor=colors.darkblue
-        ))
-        
-        # Style pour les sous-titres
-        self.styles.add(ParagraphStyle(
-            name='CustomHeading',
-            parent=self.styles['Heading2'],
-            fontSize=14,
-            spaceAfter=12,
-            textColor=colors.darkblue
-        ))
-        
-        # Style pour les informations personnelles
-        self.styles.add(ParagraphStyle(
-            name='InfoStyle',
-            parent=self.styles['Normal'],
-            fontSize=10,
-            spaceAfter=6,
-            leftIndent=20
-        ))
+    def __init__(self, templates=None):
+        # Styles et tableaux préconstruits, partagés par toutes les instances
+        self.templates = templates or report_templates
+        self.styles = self.templates.styles
+        self.balance_service = LeaveBalanceService()
     
     def calculate_leave_balance(self, employee):
         """Calcule le solde de congés d'un employé"""
-        # Utiliser le solde personnalisé de l'employé
-        annual_leaves = employee.annual_leave_days
-        
-        # Calculer les congés pris cette année
-        current_year = datetime.now().year
-        taken_leaves = Leave.query.filter(
-            Leave.employee_id == employee.id,
-            Leave.status == 'approved',
-            db.func.extract('year', Leave.start_date) == current_year
-        ).all()
-        
-        total_taken = sum(
-            (leave.end_date - leave.start_date).days + 1 
-            for leave in taken_leaves
-        )
+        return self.balance_service.calculate_balance(employee)
+    
+    @use_replica
+    def employee_report_fingerprint(self, employee):
+        """Empreinte de tout ce qui apparaît dans le rapport d'un employé
+
+        Inclut la date du jour (imprimée en pied de page, et le solde dépend de
+        l'année) et le calendrier des jours ouvrables (durées et soldes).
+        """
+        leave_count, last_update = db.session.query(
+            func.count(Leave.id),
+            func.max(Leave.updated_at)
+        ).filter(Leave.employee_id == employee.id).one()
+        calendar = get_calendar()
         
-        balance = annual_leaves - total_taken
-        return {
-            'annual': annual_leaves,
-            'taken': total_taken,
-            'balance': max(0, balance)
-        }
+        payload = [
+            self.TEMPLATE_VERSION,
+            date.today(),
+            sorted(calendar.weekend),
+            calendar.holidays,
+            employee.id,
+            employee.first_name,
+            employee.last_name,
+            employee.date_of_birth,
+            employee.gender,
+            employee.address,
+            employee.phone,
+            employee.hire_date,
+            employee.position,
+            employee.department.name if employee.department else None,
+            employee.annual_leave_days,
+            leave_count,
+            last_update
+        ]
+        return hashlib.sha256(json.dumps(payload, default=str).encode('utf-8')).hexdigest()
     
+    @use_replica
     def generate_employee_pdf(self, employee_id):
         """Génère un PDF pour un employé spécifique"""
         employee = Employee.query.get_or_404(employee_id)
-        leave_balance = self.calculate_leave_balance(employee)
-        
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4)
-        story = []
-        
-        # En-tête
-        story.append(Paragraph("AGENCE URBAINE DE TAZA-TAOUNATE", self.styles['CustomTitle']))
-        story.append(Paragraph("Rapport Personnel - Informations Employé", self.styles['CustomHeading']))
-        story.append(Spacer(1, 20))
+        return self.render_employee_pdf(self.employee_report_data(employee))
+    
+    def employee_report_data(self, employee, leave_balance=None, recent_leaves=None):
+        """Rassemble les valeurs du rapport individuel (types simples, sérialisables)
         
-        # Informations personnelles
-        story.append(Paragraph("INFORMATIONS PERSONNELLES", self.styles['CustomHeading']))
+        leave_balance et recent_leaves peuvent être fournis pré-calculés (export par lot).
+        """
+        if leave_balance is None:
+            leave_balance = self.calculate_leave_balance(employee)
+        if recent_leaves is None:
+            recent_leaves = Leave.query.filter(
+                Leave.employee_id == employee.id,
+                Leave.status == 'approved'
+            ).order_by(Leave.start_date.desc()).limit(5).all()
         
         personal_info = [
             ["Nom complet:", f"{employee.first_name} {employee.last_name}"],
@@ -99,17 +129,45 @@ class PDFExportService:
             ["Département:", employee.department.name if employee.department else "Non assigné"]
         ]
         
-        personal_table = Table(personal_info, colWidths=[2*inch, 3*inch])
-        personal_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
-            ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-            ('BACKGROUND', (1, 0), (1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
+        leave_info = [
+            ["Congés annuels accordés:", f"{leave_balance['annual']} jours"],
+            ["Congés pris cette année:", f"{leave_balance['taken']} jours"],
+            ["Solde restant:", f"{leave_balance['balance']} jours"]
+        ]
+        
+        leave_history = []
+        for leave in recent_leaves:
+            duration = leave.duration_days
+            leave_history.append([
+                leave.start_date.strftime("%d/%m/%Y"),
+                leave.end_date.strftime("%d/%m/%Y"),
+                leave.leave_type.title(),
+                f"{duration} jour(s)",
+                leave.status.title()
+            ])
+        
+        return {
+            'personal_info': personal_info,
+            'leave_info': leave_info,
+            'leave_history': leave_history,
+            'generated_on': date.today()
+        }
+    
+    def render_employee_pdf(self, data):
+        """Met en page le rapport individuel à partir de employee_report_data (sans accès base)"""
+        buffer = BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=A4)
+        story = []
+        
+        layout = self.templates.layouts['employee']
+        
+        # En-tête
+        story.extend(layout.header(self.styles))
+        
+        # Informations personnelles
+        story.append(Paragraph("INFORMATIONS PERSONNELLES", self.styles['CustomHeading']))
+        
+        personal_table = self.templates.table('personal_info', data['personal_info'])
         
         story.append(personal_table)
         story.append(Spacer(1, 20))
@@ -117,149 +175,212 @@ class PDFExportService:
         # Solde de congés
         story.append(Paragraph("SOLDE DE CONGÉS", self.styles['CustomHeading']))
         
-        leave_info = [
-            ["Congés annuels accordés:", f"{leave_balance['annual']} jours"],
-            ["Congés pris cette année:", f"{leave_balance['taken']} jours"],
-            ["Solde restant:", f"{leave_balance['balance']} jours"]
-        ]
-        
-        leave_table = Table(leave_info, colWidths=[2.5*inch, 2.5*inch])
-        leave_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.lightblue),
-            ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 11),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-            ('BACKGROUND', (1, 0), (1, -1), colors.lightcyan),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
+        leave_table = self.templates.table('leave_balance', data['leave_info'])
         
         story.append(leave_table)
         story.append(Spacer(1, 20))
         
         # Historique des congés récents
-        recent_leaves = Leave.query.filter(
-            Leave.employee_id == employee.id,
-            Leave.status == 'approved'
-        ).order_by(Leave.start_date.desc()).limit(5).all()
-        
-        if recent_leaves:
+        if data['leave_history']:
             story.append(Paragraph("HISTORIQUE DES CONGÉS RÉCENTS", self.styles['CustomHeading']))
             
-            leave_history = [["Date début", "Date fin", "Type", "Durée", "Statut"]]
-            for leave in recent_leaves:
-                duration = (leave.end_date - leave.start_date).days + 1
-                leave_history.append([
-                    leave.start_date.strftime("%d/%m/%Y"),
-                    leave.end_date.strftime("%d/%m/%Y"),
-                    leave.leave_type.title(),
-                    f"{duration} jour(s)",
-                    leave.status.title()
-                ])
+            leave_history = [["Date début", "Date fin", "Type", "Durée", "Statut"]] + data['leave_history']
             
-            history_table = Table(leave_history, colWidths=[1.2*inch, 1.2*inch, 1*inch, 0.8*inch, 1*inch])
-            history_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -1), 9),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
+            history_table = self.templates.table('leave_history', leave_history)
             
             story.append(history_table)
         
-        # Pied de page
-        story.append(Spacer(1, 30))
-        story.append(Paragraph(f"Rapport généré le {datetime.now().strftime('%d/%m/%Y à %H:%M')}", 
-                              self.styles['Normal']))
+        # Pied de page (date seule : le rapport est mis en cache pour la journée)
+        story.extend(layout.footer(self.styles, generated_on=data['generated_on']))
         
         doc.build(story)
         buffer.seek(0)
         return buffer
     
-    def generate_all_employees_pdf(self):
-        """Génère un PDF avec tous les employés"""
-        employees = Employee.query.all()
-        
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4)
-        story = []
+    def iter_employee_batches(self, batch_size=None, department_id=None):
+        """Parcourt les employés par lots (pagination par id) pour limiter la mémoire"""
+        batch_size = batch_size or self.BATCH_SIZE
+        last_id = 0
+        while True:
+            query = Employee.query.options(joinedload(Employee.department))
+            if department_id:
+                query = query.filter(Employee.department_id == department_id)
+            batch = query.filter(Employee.id > last_id)\
+                         .order_by(Employee.id)\
+                         .limit(batch_size).all()
+            if not batch:
+                return
+            last_id = batch[-1].id
+            # Les employés d'un lot traité ne sont plus référencés et sont libérés par la session
+            yield batch
+    
+    def all_employees_story(self, batch_size=None, progress=None):
+        """Génère le contenu du rapport global lot par lot (au lieu d'une liste complète)
         
-        # En-tête
-        story.append(Paragraph("AGENCE URBAINE DE TAZA-TAOUNATE", self.styles['CustomTitle']))
-        story.append(Paragraph("Rapport Global - Tous les Employés", self.styles['CustomHeading']))
-        story.append(Spacer(1, 20))
+        progress(done, total) est appelé après chaque lot, si fourni.
+        """
+        # Deux passes sur les employés : récapitulatif puis détails
+        total = 2 * Employee.query.count() if progress else 0
+        done = 0
         
-        # Tableau récapitulatif
-        story.append(Paragraph("RÉCAPITULATIF GÉNÉRAL", self.styles['CustomHeading']))
+        layout = self.templates.layouts['all_employees']
         
-        summary_data = [["Nom", "Poste", "Département", "Congés pris", "Solde restant"]]
+        # En-tête
+        yield from layout.header(self.styles)
         
-        for employee in employees:
-            leave_balance = self.calculate_leave_balance(employee)
-            summary_data.append([
-                f"{employee.first_name} {employee.last_name}",
-                employee.position,
-                employee.department.name if employee.department else "Non assigné",
-                f"{leave_balance['taken']} jours",
-                f"{leave_balance['balance']} jours"
-            ])
+        # Tableau récapitulatif, découpé en un tableau par lot
+        yield Paragraph("RÉCAPITULATIF GÉNÉRAL", self.styles['CustomHeading'])
         
-        summary_table = Table(summary_data, colWidths=[1.5*inch, 1.5*inch, 1.2*inch, 1*inch, 1*inch])
-        summary_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 9),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey])
-        ]))
+        for employees in self.iter_employee_batches(batch_size):
+            leave_balances = self.balance_service.calculate_balances(e.id for e in employees)
+            summary_data = [["Nom", "Poste", "Département", "Congés pris", "Solde restant"]]
+            
+            for employee in employees:
+                leave_balance = leave_balances[employee.id]
+                summary_data.append([
+                    f"{employee.first_name} {employee.last_name}",
+                    employee.position,
+                    employee.department.name if employee.department else "Non assigné",
+                    f"{leave_balance['taken']} jours",
+                    f"{leave_balance['balance']} jours"
+                ])
+            
+            summary_table = self.templates.table('summary', summary_data, repeatRows=1)
+            
+            yield summary_table
+            if progress:
+                done += len(employees)
+                progress(done, total)
         
-        story.append(summary_table)
-        story.append(Spacer(1, 20))
+        yield Spacer(1, 20)
         
         # Détails par employé
-        for employee in employees:
-            story.append(Paragraph(f"DÉTAILS - {employee.first_name.upper()} {employee.last_name.upper()}", 
-                                  self.styles['CustomHeading']))
+        for employees in self.iter_employee_batches(batch_size):
+            leave_balances = self.balance_service.calculate_balances(e.id for e in employees)
             
-            leave_balance = self.calculate_leave_balance(employee)
-            
-            employee_details = [
-                ["Date d'embauche:", employee.hire_date.strftime("%d/%m/%Y")],
-                ["Téléphone:", employee.phone or "Non renseigné"],
-                ["Congés annuels:", f"{leave_balance['annual']} jours"],
-                ["Congés pris:", f"{leave_balance['taken']} jours"],
-                ["Solde restant:", f"{leave_balance['balance']} jours"]
-            ]
-            
-            details_table = Table(employee_details, colWidths=[2*inch, 2*inch])
-            details_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (0, -1), colors.lightblue),
-                ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-                ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-                ('BACKGROUND', (1, 0), (1, -1), colors.lightcyan),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
+            for employee in employees:
+                yield Paragraph(f"DÉTAILS - {employee.first_name.upper()} {employee.last_name.upper()}", 
+                                self.styles['CustomHeading'])
+                
+                leave_balance = leave_balances[employee.id]
+                
+                employee_details = [
+                    ["Date d'embauche:", employee.hire_date.strftime("%d/%m/%Y")],
+                    ["Téléphone:", employee.phone or "Non renseigné"],
+                    ["Congés annuels:", f"{leave_balance['annual']} jours"],
+                    ["Congés pris:", f"{leave_balance['taken']} jours"],
+                    ["Solde restant:", f"{leave_balance['balance']} jours"]
+                ]
+                
+                details_table = self.templates.table('employee_details', employee_details)
+                
+                yield details_table
+                yield Spacer(1, 15)
             
-            story.append(details_table)
-            story.append(Spacer(1, 15))
+            if progress:
+                done += len(employees)
+                progress(done, total)
         
         # Pied de page
-        story.append(Spacer(1, 30))
-        story.append(Paragraph(f"Rapport généré le {datetime.now().strftime('%d/%m/%Y à %H:%M')}", 
-                              self.styles['Normal']))
+        yield from layout.footer(self.styles)
+    
+    @use_replica
+    def generate_all_employees_pdf(self, output=None, batch_size=None, progress=None):
+        """Génère un PDF avec tous les employés
         
-        doc.build(story)
+        Le contenu est produit au fil de la mise en page : seuls les éléments
+        du lot en cours sont en mémoire. output peut être un fichier (par
+        exemple un SpooledTemporaryFile) ; par défaut un BytesIO est utilisé.
+        progress(done, total) permet de suivre l'avancement.
+        """
+        buffer = output if output is not None else BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=A4)
+        doc.build(LazyStory(self.all_employees_story(batch_size, progress)))
         buffer.seek(0)
         return buffer
+    
+    def recent_leaves_by_employee(self, employee_ids, limit=5):
+        """Derniers congés approuvés de plusieurs employés en une requête
+
+        Fonction de fenêtrage si la base la connaît ; sinon (MySQL 5.7) sous-requête
+        corrélée comptant les congés plus récents du même employé.
+        """
+        if supports_window_functions(db.session.get_bind(clause=select(Leave.id))):
+            rank = func.row_number().over(
+                partition_by=Leave.employee_id,
+                order_by=(Leave.start_date.desc(), Leave.id.desc())
+            ).label('rank')
+            ranked = db.session.query(Leave.id, rank).filter(
+                Leave.employee_id.in_(employee_ids),
+                Leave.status == 'approved'
+            ).subquery()
+            query = Leave.query.join(ranked, ranked.c.id == Leave.id).filter(ranked.c.rank <= limit)
+        else:
+            newer = aliased(Leave)
+            newer_count = db.session.query(func.count(newer.id)).filter(
+                newer.employee_id == Leave.employee_id,
+                newer.status == 'approved',
+                or_(newer.start_date > Leave.start_date,
+                    and_(newer.start_date == Leave.start_date, newer.id > Leave.id))
+            ).correlate(Leave).scalar_subquery()
+            query = Leave.query.filter(
+                Leave.employee_id.in_(employee_ids),
+                Leave.status == 'approved',
+                newer_count < limit
+            )
+        leaves = query.order_by(Leave.employee_id, Leave.start_date.desc(), Leave.id.desc()).all()
+        
+        recent = {employee_id: [] for employee_id in employee_ids}
+        for leave in leaves:
+            recent[leave.employee_id].append(leave)
+        return recent
+    
+    @use_replica
+    def generate_employee_pdfs_zip(self, output, department_id=None, workers=None, progress=None):
+        """Génère un PDF par employé et les regroupe dans une archive ZIP
+        
+        Les données sont lues ici par lots ; la mise en page (coûteuse en CPU)
+        est répartie sur un pool de processus. progress(done, total) suit l'avancement.
+        """
+        query = Employee.query
+        if department_id:
+            query = query.filter(Employee.department_id == department_id)
+        total = query.count()
+        done = 0
+        
+        # 'spawn' relance l'interpréteur : dans l'exécutable (PyInstaller), le script de
+        # lancement doit appeler multiprocessing.freeze_support() en tête de son bloc
+        # if __name__ == '__main__', sinon chaque processus de rendu redémarre l'application
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor, \
+                zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_STORED) as archive:
+            for employees in self.iter_employee_batches(department_id=department_id):
+                ids = [employee.id for employee in employees]
+                leave_balances = self.balance_service.calculate_balances(ids)
+                recent_leaves = self.recent_leaves_by_employee(ids)
+                
+                names = []
+                reports = []
+                for employee in employees:
+                    names.append(f"rapport_{employee.id}_{employee.first_name}_{employee.last_name}.pdf")
+                    reports.append(self.employee_report_data(
+                        employee,
+                        leave_balance=leave_balances[employee.id],
+                        recent_leaves=recent_leaves[employee.id]
+                    ))
+                
+                # Les rendus du lot s'exécutent en parallèle ; l'écriture dans le ZIP reste séquentielle
+                for name, pdf_bytes in zip(names, executor.map(render_employee_report, reports)):
+                    archive.writestr(name, pdf_bytes)
+                    done += 1
+                    if progress:
+                        progress(done, total)
+        return output
+
+# Instance partagée : les styles sont construits une seule fois par processus
+pdf_export_service = PDFExportService()
+
+def render_employee_report(data):
+    """Point d'entrée des processus de rendu parallèle"""
+    return pdf_export_service.render_employee_pdf(data).getvalue()
+
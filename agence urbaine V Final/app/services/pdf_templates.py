@@ -0,0 +1,142 @@
+from collections import namedtuple
+from datetime import datetime
+from types import MappingProxyType
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import Paragraph, Spacer, Table, TableStyle
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+
+class TableTemplate(namedtuple('TableTemplate', ['col_widths', 'style'])):
+    """Largeurs de colonnes et style partagés d'un type de tableau"""
+
+    def build(self, rows, **kwargs):
+        table = Table(rows, colWidths=list(self.col_widths), **kwargs)
+        table.setStyle(self.style)
+        return table
+
+class ReportLayout(namedtuple('ReportLayout', ['title', 'subtitle'])):
+    """En-tête et pied de page d'un type de rapport"""
+
+    def header(self, styles):
+        return [
+            Paragraph(self.title, styles['CustomTitle']),
+            Paragraph(self.subtitle, styles['CustomHeading']),
+            Spacer(1, 20)
+        ]
+
+    def footer(self, styles, generated_on=None):
+        """Date de génération ; generated_on (date seule) pour les rapports mis en cache"""
+        if generated_on is not None:
+            generated = generated_on.strftime('%d/%m/%Y')
+        else:
+            generated = datetime.now().strftime('%d/%m/%Y à %H:%M')
+        return [
+            Spacer(1, 30),
+            Paragraph(f"Rapport généré le {generated}", styles['Normal'])
+        ]
+
+def build_stylesheet():
+    """Feuille de styles ReportLab avec les styles personnalisés de l'agence"""
+    styles = getSampleStyleSheet()
+
+    # Style pour le titre principal
+    styles.add(ParagraphStyle(
+        name='CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=18,
+        spaceAfter=30,
+        alignment=TA_CENTER,
+        textColor=colors.darkblue
+    ))
+
+    # Style pour les sous-titres
+    styles.add(ParagraphStyle(
+        name='CustomHeading',
+        parent=styles['Heading2'],
+        fontSize=14,
+        spaceAfter=12,
+        textColor=colors.darkblue
+    ))
+
+    # Style pour les informations personnelles
+    styles.add(ParagraphStyle(
+        name='InfoStyle',
+        parent=styles['Normal'],
+        fontSize=10,
+        spaceAfter=6,
+        leftIndent=20
+    ))
+    return styles
+
+def build_tables():
+    # Tableau clé / valeur (libellés dans la première colonne)
+    def key_value_style(label_color, value_color, font_size, padding):
+        return TableStyle([
+            ('BACKGROUND', (0, 0), (0, -1), label_color),
+            ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), font_size),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), padding),
+            ('BACKGROUND', (1, 0), (1, -1), value_color),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black)
+        ])
+
+    # Tableau avec ligne d'en-tête
+    header_commands = [
+        ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 9),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]
+
+    return MappingProxyType({
+        'personal_info': TableTemplate(
+            (2*inch, 3*inch),
+            key_value_style(colors.lightgrey, colors.beige, 10, 12)
+        ),
+        'leave_balance': TableTemplate(
+            (2.5*inch, 2.5*inch),
+            key_value_style(colors.lightblue, colors.lightcyan, 11, 12)
+        ),
+        'leave_history': TableTemplate(
+            (1.2*inch, 1.2*inch, 1*inch, 0.8*inch, 1*inch),
+            TableStyle(header_commands)
+        ),
+        'summary': TableTemplate(
+            (1.5*inch, 1.5*inch, 1.2*inch, 1*inch, 1*inch),
+            TableStyle(header_commands + [
+                ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey])
+            ])
+        ),
+        'employee_details': TableTemplate(
+            (2*inch, 2*inch),
+            key_value_style(colors.lightblue, colors.lightcyan, 10, 8)
+        )
+    })
+
+class ReportTemplates:
+    """Registre des styles et mises en page des rapports, construit une fois par processus
+
+    Les éléments du registre sont partagés entre requêtes : ils ne doivent pas être modifiés.
+    """
+
+    def __init__(self):
+        self.styles = build_stylesheet()
+        self.tables = build_tables()
+        self.layouts = MappingProxyType({
+            'employee': ReportLayout("AGENCE URBAINE DE TAZA-TAOUNATE",
+                                     "Rapport Personnel - Informations Employé"),
+            'all_employees': ReportLayout("AGENCE URBAINE DE TAZA-TAOUNATE",
+                                          "Rapport Global - Tous les Employés")
+        })
+
+    def table(self, name, rows, **kwargs):
+        return self.tables[name].build(rows, **kwargs)
+
+report_templates = ReportTemplates()
@@ -0,0 +1,17 @@
+import os
+
+def process_alive(pid):
+    """Vrai si le processus pid existe encore sur cette machine"""
+    if pid is None:
+        return False
+    if os.name == 'nt':
+        # os.kill(pid, 0) terminerait le processus sous Windows ; l'exécutable
+        # n'a qu'un processus, un autre pid est donc celui d'un lancement précédent
+        return pid == os.getpid()
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
@@ -0,0 +1,157 @@
+import heapq
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from flask import before_render_template, current_app, g, has_app_context, request, template_rendered
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+class RequestProfile:
+    """Mesures d'une requête : durée totale, requêtes SQL, rendu des gabarits"""
+
+    def __init__(self, slow_statements=3):
+        self.started = time.perf_counter()
+        self.slow_statements = slow_statements
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.statements = []  # tas des (durée, instruction) les plus lentes
+        self.template_time = 0.0
+        self._template_started = []
+
+    def add_statement(self, statement, duration):
+        self.sql_count += 1
+        self.sql_time += duration
+        item = (duration, statement[:300])
+        if len(self.statements) < self.slow_statements:
+            heapq.heappush(self.statements, item)
+        elif duration > self.statements[0][0]:
+            heapq.heapreplace(self.statements, item)
+
+    def start_template(self):
+        self._template_started.append(time.perf_counter())
+
+    def end_template(self):
+        if self._template_started:
+            self.template_time += time.perf_counter() - self._template_started.pop()
+
+    def finish(self, endpoint, method, path, status):
+        return {
+            'endpoint': endpoint or '-',
+            'method': method,
+            'path': path,
+            'status': status,
+            'at': datetime.now().isoformat(timespec='seconds'),
+            'wall_ms': round(1000 * (time.perf_counter() - self.started), 2),
+            'sql_count': self.sql_count,
+            'sql_ms': round(1000 * self.sql_time, 2),
+            'template_ms': round(1000 * self.template_time, 2),
+            'slow_statements': [
+                {'ms': round(1000 * duration, 2), 'sql': statement}
+                for duration, statement in sorted(self.statements, reverse=True)
+            ]
+        }
+
+class RequestProfiler:
+    """Instrumentation optionnelle des requêtes HTTP (PROFILING_ENABLED)
+
+    Une fraction des requêtes (PROFILING_SAMPLE_RATE) est mesurée : temps
+    total, nombre et durée des instructions SQL (événements
+    before/after_cursor_execute), les plus lentes, et temps de rendu des
+    gabarits. Les mesures sont renvoyées dans l'en-tête Server-Timing et
+    gardées dans un tampon circulaire par processus (PROFILING_BUFFER_SIZE).
+    Les requêtes non échantillonnées ne paient qu'un test sur g.
+    """
+
+    def __init__(self):
+        self.records = deque(maxlen=500)
+        self._lock = threading.Lock()
+        self._installed = False
+
+    def init_app(self, app):
+        if not app.config['PROFILING_ENABLED']:
+            return
+        self.records = deque(self.records, maxlen=app.config['PROFILING_BUFFER_SIZE'])
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        with self._lock:
+            if self._installed:
+                return
+            self._installed = True
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        before_render_template.connect(_before_render, weak=False)
+        template_rendered.connect(_after_render, weak=False)
+
+    def _before_request(self):
+        if random.random() < current_app.config['PROFILING_SAMPLE_RATE']:
+            g._profile = RequestProfile(current_app.config['PROFILING_SLOW_STATEMENTS'])
+
+    def _after_request(self, response):
+        profile = g.pop('_profile', None)
+        if profile is None:
+            return response
+        record = profile.finish(request.endpoint, request.method, request.path, response.status_code)
+        with self._lock:
+            self.records.append(record)
+        response.headers['Server-Timing'] = ', '.join([
+            f"app;dur={record['wall_ms']}",
+            f"sql;dur={record['sql_ms']};desc=\"{record['sql_count']} SQL\"",
+            f"tpl;dur={record['template_ms']}"
+        ])
+        return response
+
+    def recent(self):
+        with self._lock:
+            return list(self.records)
+
+    def slowest_endpoints(self, limit=20):
+        """Statistiques par endpoint (du plus lent au plus rapide en moyenne)"""
+        by_endpoint = {}
+        for record in self.recent():
+            by_endpoint.setdefault((record['method'], record['endpoint']), []).append(record)
+
+        endpoints = []
+        for (method, endpoint), records in by_endpoint.items():
+            walls = sorted(record['wall_ms'] for record in records)
+            count = len(records)
+            endpoints.append({
+                'endpoint': endpoint,
+                'method': method,
+                'count': count,
+                'wall_ms_avg': round(sum(walls) / count, 2),
+                'wall_ms_p95': walls[min(count - 1, int(0.95 * count))],
+                'wall_ms_max': walls[-1],
+                'sql_count_avg': round(sum(record['sql_count'] for record in records) / count, 1),
+                'sql_ms_avg': round(sum(record['sql_ms'] for record in records) / count, 2),
+                'template_ms_avg': round(sum(record['template_ms'] for record in records) / count, 2),
+                'slowest': max(records, key=lambda record: record['wall_ms'])
+            })
+        endpoints.sort(key=lambda item: item['wall_ms_avg'], reverse=True)
+        return endpoints[:limit]
+
+def _current_profile():
+    return g.get('_profile') if has_app_context() else None
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _current_profile() is not None:
+        context._profiling_started = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, '_profiling_started', None)
+    profile = _current_profile()
+    if started is not None and profile is not None:
+        profile.add_statement(statement, time.perf_counter() - started)
+
+def _before_render(sender, template, context, **extra):
+    profile = _current_profile()
+    if profile is not None:
+        profile.start_template()
+
+def _after_render(sender, template, context, **extra):
+    profile = _current_profile()
+    if profile is not None:
+        profile.end_template()
+
+request_profiler = RequestProfiler()
@@ -0,0 +1,121 @@
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from flask import current_app, has_app_context, has_request_context, session as user_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Select, event
+
+REPLICA_BIND = 'replica'
+# Clés de session.info : lectures redirigées, écritures non encore validées
+READS_KEY = 'replica_reads'
+FLUSHED_KEY = 'replica_flushed'
+# Clé du cookie de session : lectures sur la base principale jusqu'à cette date
+STICKY_KEY = '_primary_until'
+
+class ReplicaStickiness:
+    """Date jusqu'à laquelle ce processus lit sur la base principale après une écriture
+
+    Couvre le retard de réplication pour les caches du processus (tableau de
+    bord, calendrier) recalculés juste après une invalidation.
+    """
+
+    def __init__(self):
+        self._until = 0.0
+        self._lock = threading.Lock()
+
+    def extend(self, until):
+        with self._lock:
+            self._until = max(self._until, until)
+
+    def active(self, now):
+        return now < self._until
+
+stickiness = ReplicaStickiness()
+
+class RoutingSession(Session):
+    """Session Flask-SQLAlchemy envoyant les SELECT des lectures marquées vers le réplica
+
+    Les lectures ne sont redirigées qu'à l'intérieur de replica_reads() /
+    @use_replica et si le bind 'replica' est configuré. Elles restent sur la
+    base principale tant que la session a des écritures non validées, et
+    pendant REPLICA_STICKY_SECONDS après un commit (pour l'utilisateur qui a
+    écrit, via le cookie de session, et pour tout le processus).
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and self.info.get(READS_KEY)
+                and isinstance(clause, Select) and clause._for_update_arg is None
+                and not self._primary_required()):
+            engine = self._db.engines.get(REPLICA_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _primary_required(self):
+        if self.info.get(FLUSHED_KEY):
+            return True
+        now = time.time()
+        if stickiness.active(now):
+            return True
+        return has_request_context() and now < user_session.get(STICKY_KEY, 0)
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _mark_flush(session, flush_context):
+    session.info[FLUSHED_KEY] = True
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _mark_bulk_write(orm_execute_state):
+    # query.update() / query.delete() ne passent pas par le flush
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info[FLUSHED_KEY] = True
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _stick_to_primary(session):
+    if not session.info.pop(FLUSHED_KEY, False):
+        return
+    delay = current_app.config['REPLICA_STICKY_SECONDS'] if has_app_context() else 0
+    if delay > 0:
+        until = time.time() + delay
+        stickiness.extend(until)
+        if has_request_context():
+            user_session[STICKY_KEY] = until
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _discard_flush(session):
+    session.info.pop(FLUSHED_KEY, None)
+
+@contextmanager
+def replica_reads(session=None):
+    """Envoie vers le réplica les lectures faites dans ce bloc (sans effet sans réplica)"""
+    if session is None:
+        from app import db
+        session = db.session()
+    previous = session.info.get(READS_KEY, False)
+    session.info[READS_KEY] = True
+    try:
+        yield session
+    finally:
+        session.info[READS_KEY] = previous
+
+def use_replica(function):
+    """Décorateur : la vue ou la méthode lit sur le réplica"""
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        with replica_reads():
+            return function(*args, **kwargs)
+    return wrapper
+
+def iter_from_replica(iterable):
+    """Itère en lisant sur le réplica (réponses en streaming, lues après la fin de la vue)
+
+    La session est celle de la vue : les requêtes déjà construites y sont
+    liées, alors que le streaming s'exécute dans un contexte recopié.
+    """
+    from app import db
+    session = db.session()
+
+    def rows():
+        with replica_reads(session):
+            yield from iterable
+    return rows()
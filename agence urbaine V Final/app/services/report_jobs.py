@@ -0,0 +1,186 @@
+import json
+import os
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import update
+from app.models.report_job import ReportJob
+from app.services.metrics import pdf_render_duration
+from app.services.processes import process_alive
+from app import db
+
+UNFINISHED_STATUSES = ('pending', 'running')
+FINISHED_STATUSES = ('done', 'failed')
+
+def _all_employees_pdf(output, progress):
+    from app.services.pdf_export import pdf_export_service
+    pdf_export_service.generate_all_employees_pdf(output=output, progress=progress)
+    return f"rapport_tous_employes_{datetime.now().strftime('%Y%m%d')}.pdf"
+
+def _employee_pdfs_zip(output, progress, department_id=None):
+    from app.services.pdf_export import pdf_export_service
+    pdf_export_service.generate_employee_pdfs_zip(
+        output,
+        department_id=department_id,
+        workers=current_app.config['PDF_BATCH_WORKERS'],
+        progress=progress
+    )
+    suffix = f"_departement_{department_id}" if department_id else ""
+    return f"rapports_employes{suffix}_{datetime.now().strftime('%Y%m%d')}.zip"
+
+class ReportJobService:
+    """File d'attente en processus (pool de threads) pour la génération de rapports
+
+    L'état des tâches est stocké dans la table report_jobs : n'importe quel
+    worker peut donc répondre au suivi et au téléchargement. Au premier
+    lancement ou suivi d'une tâche dans un processus (ou par "flask reports
+    cleanup"), les tâches de cette machine dont le processus s'est arrêté
+    passent en échec ; les tâches terminées depuis REPORT_JOB_RETENTION_HOURS
+    sont supprimées (ligne et fichier), puis de nouveau à chaque nouvelle tâche.
+    """
+
+    # Type de rapport -> fonction(output, progress, **params) écrivant le fichier et retournant son nom
+    GENERATORS = {
+        'all_employees_pdf': _all_employees_pdf,
+        'employee_pdfs_zip': _employee_pdfs_zip
+    }
+
+    def __init__(self):
+        self._executor = None
+        self._maintained = False
+        self._lock = threading.Lock()
+
+    def get_executor(self, app):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=app.config['REPORT_JOB_WORKERS'],
+                    thread_name_prefix='report-job'
+                )
+            return self._executor
+
+    def output_dir(self, app):
+        directory = app.config.get('REPORT_JOB_DIR') or os.path.join(app.instance_path, 'reports')
+        os.makedirs(directory, exist_ok=True)
+        return directory
+
+    def maintain(self, app):
+        """Tâches orphelines en échec et purge des rapports expirés ; retourne (orphelines, purgées)"""
+        return self.fail_orphaned_jobs(), self.purge_expired(app)
+
+    def ensure_maintained(self, app):
+        """maintain() une fois par processus, au premier lancement ou suivi d'une tâche"""
+        if self._maintained:
+            return
+        with self._lock:
+            if self._maintained:
+                return
+            self._maintained = True
+        self.maintain(app)
+
+    def fail_orphaned_jobs(self):
+        """Passe en échec les tâches non terminées de cette machine dont le processus s'est arrêté"""
+        current_pid = os.getpid()
+        orphaned = [
+            job_id for job_id, pid in db.session.query(ReportJob.id, ReportJob.pid).filter(
+                ReportJob.host == socket.gethostname(),
+                ReportJob.status.in_(UNFINISHED_STATUSES)
+            )
+            if pid != current_pid and not process_alive(pid)
+        ]
+        if orphaned:
+            db.session.query(ReportJob).filter(
+                ReportJob.id.in_(orphaned),
+                ReportJob.status.in_(UNFINISHED_STATUSES)
+            ).update({
+                'status': 'failed',
+                'error': 'Génération interrompue (redémarrage du serveur)',
+                'finished_at': datetime.utcnow()
+            }, synchronize_session=False)
+            db.session.commit()
+        return len(orphaned)
+
+    def purge_expired(self, app):
+        """Supprime les tâches terminées depuis plus de REPORT_JOB_RETENTION_HOURS et leurs fichiers"""
+        cutoff = datetime.utcnow() - timedelta(hours=app.config['REPORT_JOB_RETENTION_HOURS'])
+        expired = db.session.query(ReportJob.id, ReportJob.file_path).filter(
+            ReportJob.status.in_(FINISHED_STATUSES),
+            ReportJob.finished_at < cutoff
+        ).all()
+        if not expired:
+            return 0
+        for _, path in expired:
+            if path:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        db.session.query(ReportJob).filter(
+            ReportJob.id.in_([job_id for job_id, _ in expired])
+        ).delete(synchronize_session=False)
+        db.session.commit()
+        return len(expired)
+
+    def enqueue(self, kind, user_id, **params):
+        """Crée la tâche en base et la confie au pool ; retourne le ReportJob"""
+        if kind not in self.GENERATORS:
+            raise ValueError(f'Type de rapport inconnu : {kind}')
+
+        app = current_app._get_current_object()
+        if self._maintained:
+            self.purge_expired(app)
+        else:
+            self.ensure_maintained(app)
+
+        job = ReportJob(kind=kind, user_id=user_id, status='pending', progress=0,
+                        params=json.dumps(params) if params else None,
+                        host=socket.gethostname(), pid=os.getpid())
+        db.session.add(job)
+        db.session.commit()
+
+        self.get_executor(app).submit(self._run, app, job.id)
+        return job
+
+    def _set_progress(self, job_id, percent):
+        # Connexion séparée : un commit de la session expirerait les objets du rapport en cours
+        with db.engine.begin() as connection:
+            connection.execute(update(ReportJob).where(ReportJob.id == job_id).values(progress=percent))
+
+    def _run(self, app, job_id):
+        with app.app_context():
+            job = db.session.get(ReportJob, job_id)
+            job.status = 'running'
+            db.session.commit()
+
+            path = os.path.join(self.output_dir(app), f'{job.kind}_{job.id}.tmp')
+            last_percent = [0]
+
+            def progress(done, total):
+                percent = min(99, int(100 * done / total)) if total else 0
+                if percent > last_percent[0]:
+                    last_percent[0] = percent
+                    self._set_progress(job_id, percent)
+
+            try:
+                with open(path, 'wb') as output, pdf_render_duration.time(report=job.kind):
+                    filename = self.GENERATORS[job.kind](output, progress, **job.parameters)
+                job = db.session.get(ReportJob, job_id)
+                job.status = 'done'
+                job.progress = 100
+                job.file_path = path
+                job.filename = filename
+            except Exception as e:
+                db.session.rollback()
+                if os.path.exists(path):
+                    os.remove(path)
+                job = db.session.get(ReportJob, job_id)
+                job.status = 'failed'
+                job.error = str(e)
+            finally:
+                job.finished_at = datetime.utcnow()
+                db.session.commit()
+                db.session.remove()
+
+report_jobs = ReportJobService()
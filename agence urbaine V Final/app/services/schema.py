@@ -0,0 +1,26 @@
+from flask_migrate import stamp, upgrade
+from sqlalchemy import inspect
+from app import db
+
+# Première révision : schéma des bases créées par db.create_all() avant les migrations
+INITIAL_REVISION = '0001'
+
+def create_schema():
+    """Base neuve : tables créées d'après les modèles, marquées à la dernière migration"""
+    db.create_all()
+    stamp()
+
+def upgrade_schema():
+    """Crée une base neuve, sinon applique les migrations en attente ; retourne l'opération effectuée
+
+    Une base créée avant les migrations (tables sans alembic_version) est
+    d'abord marquée à la révision initiale.
+    """
+    tables = set(inspect(db.engine).get_table_names())
+    if not tables:
+        create_schema()
+        return 'création'
+    if 'alembic_version' not in tables:
+        stamp(revision=INITIAL_REVISION)
+    upgrade()
+    return 'migration'
@@ -0,0 +1,137 @@
+import csv
+import io
+from datetime import datetime
+from sqlalchemy import func, and_
+from app.models.department import Department
+from app.models.employee import Employee
+from app.models.leave import Leave
+from app.models.leave_ledger import LeaveLedger
+from app.models.user import User
+from app.services.business_calendar import get_calendar
+from app import db
+
+# Premiers caractères qu'Excel ou LibreOffice interprètent comme une formule
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+def neutralize(value):
+    """Texte commençant comme une formule préfixé d'une apostrophe (injection CSV/XLSX)"""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+class TabularExportService:
+    """Exports tabulaires (CSV, XLSX) des employés, congés et soldes
+
+    Les lignes sont lues par paquets (yield_per : curseur serveur sur MySQL)
+    et écrites au fil de l'eau : la mémoire reste constante quel que soit le
+    nombre de lignes. Les textes saisis par les utilisateurs qui commencent
+    comme une formule sont neutralisés (neutralize).
+    """
+
+    YIELD_PER = 1000
+    CSV_FLUSH_ROWS = 500
+    DATASETS = ('employees', 'leaves', 'balances')
+
+    def dataset(self, name, year=None, department_id=None, status=None):
+        """Retourne (en-tête, itérateur de lignes) du jeu de données demandé"""
+        if name == 'employees':
+            return self.employees(department_id)
+        if name == 'leaves':
+            return self.leaves(year, department_id, status)
+        if name == 'balances':
+            return self.balances(year, department_id)
+        raise ValueError(f'Jeu de données inconnu : {name}')
+
+    def employees(self, department_id=None):
+        header = ['ID', 'Prénom', 'Nom', 'Email', 'Rôle', 'Département', 'Poste',
+                  'Date d\'embauche', 'Jours de congés annuels']
+        query = db.session.query(
+            Employee.id, Employee.first_name, Employee.last_name, User.email, User.role,
+            Department.name, Employee.position, Employee.hire_date, Employee.annual_leave_days
+        ).join(User, Employee.user_id == User.id).outerjoin(
+            Department, Employee.department_id == Department.id
+        )
+        if department_id:
+            query = query.filter(Employee.department_id == department_id)
+        return header, (tuple(row) for row in query.order_by(Employee.id).yield_per(self.YIELD_PER))
+
+    def leaves(self, year=None, department_id=None, status=None):
+        header = ['ID', 'ID employé', 'Prénom', 'Nom', 'Département', 'Type', 'Statut',
+                  'Début', 'Fin', 'Jours ouvrables', 'Soumis le']
+        query = db.session.query(
+            Leave.id, Employee.id, Employee.first_name, Employee.last_name, Department.name,
+            Leave.leave_type, Leave.status, Leave.start_date, Leave.end_date, Leave.created_at
+        ).join(Employee, Leave.employee_id == Employee.id).outerjoin(
+            Department, Employee.department_id == Department.id
+        )
+        if year:
+            query = query.filter(Leave.starting_in_year(year))
+        if department_id:
+            query = query.filter(Employee.department_id == department_id)
+        if status:
+            query = query.filter(Leave.status == status)
+
+        calendar = get_calendar()
+
+        def rows():
+            for (leave_id, employee_id, first_name, last_name, department, leave_type,
+                 leave_status, start, end, created_at) in query.order_by(Leave.id).yield_per(self.YIELD_PER):
+                yield (leave_id, employee_id, first_name, last_name, department, leave_type,
+                       leave_status, start, end, calendar.count(start, end),
+                       created_at.replace(microsecond=0) if created_at else None)
+        return header, rows()
+
+    def balances(self, year=None, department_id=None):
+        """Soldes calculés à partir du cumul leave_ledger (année en cours par défaut)"""
+        year = year or datetime.now().year
+        header = ['ID employé', 'Prénom', 'Nom', 'Département', 'Année',
+                  'Jours annuels', 'Jours pris', 'Jours en attente', 'Solde']
+        query = db.session.query(
+            Employee.id, Employee.first_name, Employee.last_name, Department.name,
+            Employee.annual_leave_days,
+            func.coalesce(func.sum(LeaveLedger.days_taken), 0),
+            func.coalesce(func.sum(LeaveLedger.days_pending), 0)
+        ).outerjoin(LeaveLedger, and_(
+            LeaveLedger.employee_id == Employee.id,
+            LeaveLedger.year == year
+        )).outerjoin(
+            Department, Employee.department_id == Department.id
+        ).group_by(
+            Employee.id, Employee.first_name, Employee.last_name, Department.name, Employee.annual_leave_days
+        )
+        if department_id:
+            query = query.filter(Employee.department_id == department_id)
+
+        def rows():
+            for (employee_id, first_name, last_name, department, annual,
+                 taken, pending) in query.order_by(Employee.id).yield_per(self.YIELD_PER):
+                taken, pending = int(taken), int(pending)
+                yield (employee_id, first_name, last_name, department, year,
+                       annual, taken, pending, max(0, annual - taken))
+        return header, rows()
+
+    def iter_csv(self, header, rows):
+        """CSV (UTF-8 avec BOM, séparateur ';' pour Excel) produit par morceaux"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, delimiter=';')
+        buffer.write('\ufeff')
+        writer.writerow(header)
+        for count, row in enumerate(rows, start=1):
+            writer.writerow(['' if value is None else neutralize(value) for value in row])
+            if count % self.CSV_FLUSH_ROWS == 0:
+                yield buffer.getvalue().encode('utf-8')
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue().encode('utf-8')
+
+    def write_xlsx(self, header, rows, output):
+        """Classeur XLSX en mode écriture seule (lignes écrites au fil de l'eau) dans output"""
+        from openpyxl import Workbook
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        sheet.append(header)
+        for row in rows:
+            sheet.append([neutralize(value) for value in row])
+        workbook.save(output)
+
+tabular_export_service = TabularExportService()
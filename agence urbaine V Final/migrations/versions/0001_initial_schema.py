@@ -0,0 +1,94 @@
+"""Schéma initial (utilisateurs, départements, employés, congés)
+
+Bases créées avant les migrations : "flask db stamp 0001" puis "flask db upgrade".
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 09:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'users',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('email', sa.String(length=120), nullable=False),
+        sa.Column('username', sa.String(length=80), nullable=False),
+        sa.Column('password_hash', sa.String(length=128), nullable=True),
+        sa.Column('role', sa.String(length=20), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('email'),
+        sa.UniqueConstraint('username')
+    )
+    op.create_table(
+        'departments',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('description', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name')
+    )
+    op.create_table(
+        'employees',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('first_name', sa.String(length=50), nullable=False),
+        sa.Column('last_name', sa.String(length=50), nullable=False),
+        sa.Column('date_of_birth', sa.Date(), nullable=False),
+        sa.Column('gender', sa.String(length=10), nullable=False),
+        sa.Column('address', sa.String(length=200), nullable=True),
+        sa.Column('phone', sa.String(length=20), nullable=True),
+        sa.Column('hire_date', sa.Date(), nullable=False),
+        sa.Column('department_id', sa.Integer(), nullable=True),
+        sa.Column('position', sa.String(length=100), nullable=False),
+        sa.Column('is_manager', sa.Boolean(), nullable=True),
+        sa.Column('annual_leave_days', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['department_id'], ['departments.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id')
+    )
+    op.create_table(
+        'department_managers',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('department_id', sa.Integer(), nullable=False),
+        sa.Column('employee_id', sa.Integer(), nullable=False),
+        sa.Column('assigned_date', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['department_id'], ['departments.id']),
+        sa.ForeignKeyConstraint(['employee_id'], ['employees.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table(
+        'leaves',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('employee_id', sa.Integer(), nullable=False),
+        sa.Column('start_date', sa.Date(), nullable=False),
+        sa.Column('end_date', sa.Date(), nullable=False),
+        sa.Column('leave_type', sa.String(length=20), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.Column('reason', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['employee_id'], ['employees.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('leaves')
+    op.drop_table('department_managers')
+    op.drop_table('employees')
+    op.drop_table('departments')
+    op.drop_table('users')
@@ -0,0 +1,34 @@
+"""Index composites de la table leaves (soldes, congés en cours, listes, index mémoire)
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 09:10:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    'ix_leaves_employee_status_start': ['employee_id', 'status', 'start_date'],
+    'ix_leaves_status_start_end': ['status', 'start_date', 'end_date'],
+    'ix_leaves_created_id': ['created_at', 'id'],
+    'ix_leaves_employee_created': ['employee_id', 'created_at'],
+    'ix_leaves_updated_at': ['updated_at'],
+}
+
+
+def upgrade():
+    for name, columns in INDEXES.items():
+        op.create_index(name, 'leaves', columns)
+
+
+def downgrade():
+    for name in reversed(list(INDEXES)):
+        op.drop_index(name, table_name='leaves')
@@ -0,0 +1,56 @@
+"""Cumul des congés par employé, année et type (leave_ledger), rempli depuis l'historique
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 09:20:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    ledger = op.create_table(
+        'leave_ledger',
+        sa.Column('employee_id', sa.Integer(), nullable=False),
+        sa.Column('year', sa.Integer(), nullable=False),
+        sa.Column('leave_type', sa.String(length=20), nullable=False),
+        sa.Column('days_taken', sa.Integer(), nullable=False),
+        sa.Column('days_pending', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['employee_id'], ['employees.id']),
+        sa.PrimaryKeyConstraint('employee_id', 'year', 'leave_type')
+    )
+
+    # Remplissage initial, en jours ouvrables selon le calendrier configuré
+    from app.services.business_calendar import get_calendar
+    from app.services.leave_balance import LeaveBalanceService
+    leaves = sa.table(
+        'leaves',
+        sa.column('employee_id', sa.Integer),
+        sa.column('leave_type', sa.String),
+        sa.column('status', sa.String),
+        sa.column('start_date', sa.Date),
+        sa.column('end_date', sa.Date)
+    )
+    rows = op.get_bind().execute(
+        sa.select(leaves.c.employee_id, leaves.c.leave_type, leaves.c.status,
+                  leaves.c.start_date, leaves.c.end_date)
+        .where(leaves.c.status.in_(('approved', 'pending')))
+    )
+    totals = LeaveBalanceService.aggregate_ledger(rows, get_calendar())
+    op.bulk_insert(ledger, [
+        {'employee_id': employee_id, 'year': year, 'leave_type': leave_type,
+         'days_taken': taken, 'days_pending': pending}
+        for (employee_id, year, leave_type), (taken, pending) in totals.items()
+    ])
+
+
+def downgrade():
+    op.drop_table('leave_ledger')
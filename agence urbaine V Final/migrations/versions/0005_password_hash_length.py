@@ -0,0 +1,28 @@
+"""users.password_hash élargi à 255 caractères (empreintes scrypt de 162 caractères)
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 09:40:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.alter_column('password_hash', existing_type=sa.String(length=128),
+                              type_=sa.String(length=255), existing_nullable=True)
+
+
+def downgrade():
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.alter_column('password_hash', existing_type=sa.String(length=255),
+                              type_=sa.String(length=128), existing_nullable=True)
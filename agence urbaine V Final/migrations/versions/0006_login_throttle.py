@@ -0,0 +1,31 @@
+"""Compteurs d'échecs de connexion partagés entre workers (login_throttle)
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 09:50:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'login_throttle',
+        sa.Column('key', sa.String(length=190), nullable=False),
+        sa.Column('window_start', sa.Integer(), nullable=False),
+        sa.Column('previous_count', sa.Integer(), nullable=False),
+        sa.Column('current_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('key')
+    )
+
+
+def downgrade():
+    op.drop_table('login_throttle')
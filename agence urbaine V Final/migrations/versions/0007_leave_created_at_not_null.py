@@ -0,0 +1,28 @@
+"""leaves.created_at obligatoire (clé de la pagination par curseur)
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Congés saisis sans date de création : date de dernière modification, à défaut la date courante
+    op.execute("UPDATE leaves SET created_at = COALESCE(updated_at, CURRENT_TIMESTAMP) WHERE created_at IS NULL")
+    with op.batch_alter_table('leaves') as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('leaves') as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=True)
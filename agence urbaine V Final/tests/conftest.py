@@ -0,0 +1,74 @@
+from contextlib import contextmanager
+from datetime import date, timedelta
+import pytest
+from sqlalchemy import event
+from app import create_app, db
+from app.models import Department, DepartmentManager, Employee, Leave, User
+from app.services.leave_balance import LeaveBalanceService
+from config.config import TestingConfig
+
+DEPARTMENTS = 3
+EMPLOYEES_PER_DEPARTMENT = 8
+
+def seed(today):
+    """Départements avec responsable, employés et deux congés chacun (un en cours, un à venir)"""
+    admin = User(email='admin@example.com', username='admin', role='admin')
+    db.session.add(admin)
+    for d in range(DEPARTMENTS):
+        department = Department(name=f'Service {d}')
+        db.session.add(department)
+        db.session.flush()
+        for e in range(EMPLOYEES_PER_DEPARTMENT):
+            user = User(email=f'e{d}-{e}@example.com', username=f'e{d}-{e}', role='employee')
+            db.session.add(user)
+            db.session.flush()
+            employee = Employee(user_id=user.id, first_name=f'Prénom{e}', last_name=f'Nom{d}',
+                                date_of_birth=date(1990, 1, 1), gender='M', position='Technicien',
+                                department_id=department.id, hire_date=date(2020, 1, 1))
+            db.session.add(employee)
+            db.session.flush()
+            if e == 0:
+                db.session.add(DepartmentManager(department_id=department.id, employee_id=employee.id))
+            db.session.add(Leave(employee_id=employee.id, leave_type='vacation', status='approved',
+                                 start_date=today - timedelta(days=e), end_date=today + timedelta(days=2)))
+            db.session.add(Leave(employee_id=employee.id, leave_type='sick', status='pending',
+                                 start_date=today + timedelta(days=30 + e), end_date=today + timedelta(days=32 + e)))
+    db.session.commit()
+    LeaveBalanceService().rebuild_ledger()
+    return admin.id
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    TestingConfig.METRICS_DIR = str(tmp_path_factory.mktemp('metrics'))
+    TestingConfig.REPORT_JOB_DIR = str(tmp_path_factory.mktemp('reports'))
+    app = create_app('testing')
+    with app.app_context():
+        app.config['ADMIN_USER_ID'] = seed(date.today())
+    return app
+
+@pytest.fixture
+def admin_client(app):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(app.config['ADMIN_USER_ID'])
+        session['_fresh'] = True
+    return client
+
+@pytest.fixture
+def count_queries(app):
+    """Compte les instructions SQL exécutées dans le bloc : with count_queries() as queries: ..."""
+    @contextmanager
+    def counter():
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'after_cursor_execute', record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, 'after_cursor_execute', record)
+    return counter
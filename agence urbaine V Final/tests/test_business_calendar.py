@@ -0,0 +1,48 @@
+from datetime import date, timedelta
+from app.services.business_calendar import BusinessCalendar, moroccan_holidays
+
+def naive_count(calendar, start, end):
+    days = 0
+    day = start
+    while day <= end:
+        days += calendar.is_working_day(day)
+        day += timedelta(days=1)
+    return days
+
+def test_count_skips_weekends():
+    calendar = BusinessCalendar()
+    # Lundi 2 mars au dimanche 15 mars 2026 : deux semaines complètes
+    assert calendar.count(date(2026, 3, 2), date(2026, 3, 15)) == 10
+    assert calendar.count(date(2026, 3, 7), date(2026, 3, 8)) == 0
+
+def test_count_skips_holidays_on_working_days_only():
+    # Fête du travail : vendredi 1er mai 2026 ; 1er janvier 2028 : samedi
+    calendar = BusinessCalendar(holidays=[date(2026, 5, 1), date(2028, 1, 1)])
+    assert calendar.count(date(2026, 4, 27), date(2026, 5, 1)) == 4
+    assert calendar.holidays == [date(2026, 5, 1)]
+
+def test_count_of_empty_range_is_zero():
+    assert BusinessCalendar().count(date(2026, 3, 10), date(2026, 3, 9)) == 0
+
+def test_configurable_weekend():
+    calendar = BusinessCalendar(weekend=(4,))  # vendredi seulement
+    assert calendar.count(date(2026, 3, 2), date(2026, 3, 8)) == 6
+
+def test_count_matches_day_by_day():
+    calendar = BusinessCalendar(holidays=moroccan_holidays([2025, 2026]))
+    start = date(2025, 12, 20)
+    for length in range(40):
+        end = start + timedelta(days=length)
+        assert calendar.count(start, end) == naive_count(calendar, start, end)
+
+def test_count_many():
+    calendar = BusinessCalendar()
+    ranges = [(date(2026, 3, 2), date(2026, 3, 6)), (date(2026, 3, 6), date(2026, 3, 9))]
+    assert calendar.count_many(ranges) == [5, 2]
+
+def test_moroccan_holidays():
+    holidays = moroccan_holidays([2026])
+    assert date(2026, 11, 6) in holidays  # Marche Verte
+    assert date(2026, 1, 14) in holidays  # Nouvel an amazigh
+    assert {date(2026, 3, 20), date(2026, 3, 21)} <= holidays  # Aïd al-Fitr (estimé)
+    assert date(2023, 1, 14) not in moroccan_holidays([2023])
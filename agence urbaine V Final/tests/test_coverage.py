@@ -0,0 +1,49 @@
+from datetime import date, timedelta
+import pytest
+from app import db
+from app.models import Department, Employee
+from app.services.coverage import CoverageAnalyzer, coverage_analyzer
+from tests.conftest import EMPLOYEES_PER_DEPARTMENT
+
+def test_merge_joins_overlapping_and_adjacent_intervals():
+    intervals = [
+        (date(2026, 3, 10), date(2026, 3, 12)),
+        (date(2026, 3, 2), date(2026, 3, 4)),
+        (date(2026, 3, 5), date(2026, 3, 6)),
+        (date(2026, 3, 11), date(2026, 3, 11)),
+    ]
+    assert CoverageAnalyzer._merge(intervals) == [
+        [date(2026, 3, 2), date(2026, 3, 6)],
+        [date(2026, 3, 10), date(2026, 3, 12)],
+    ]
+
+@pytest.fixture
+def department_id(app):
+    with app.app_context():
+        yield db.session.query(Department.id).filter(Department.name == 'Service 0').scalar()
+
+def test_department_coverage_counts_each_absent_employee_once(app, department_id):
+    # L'employé n°e du service est en congé approuvé de J-e à J+2
+    today = date.today()
+    with app.app_context():
+        coverage = coverage_analyzer.department_coverage(department_id, today - timedelta(days=3), today + timedelta(days=3))
+
+    assert coverage['headcount'] == EMPLOYEES_PER_DEPARTMENT
+    absent = [day['absent'] for day in coverage['days']]
+    assert absent == [EMPLOYEES_PER_DEPARTMENT - 3, EMPLOYEES_PER_DEPARTMENT - 2, EMPLOYEES_PER_DEPARTMENT - 1,
+                      EMPLOYEES_PER_DEPARTMENT, EMPLOYEES_PER_DEPARTMENT, EMPLOYEES_PER_DEPARTMENT, 0]
+    assert coverage['days'][3]['coverage'] == 0
+    assert coverage['days'][6]['coverage'] == 1
+
+def test_department_coverage_with_simulated_absence(app, department_id):
+    start = date.today() + timedelta(days=60)
+    end = start + timedelta(days=6)
+    with app.app_context():
+        employee_id = db.session.query(Employee.id).filter(Employee.department_id == department_id).first()[0]
+        coverage = coverage_analyzer.department_coverage(department_id, start, end, extra_absences=[
+            (employee_id, start, start + timedelta(days=1)),
+            (employee_id, start + timedelta(days=1), start + timedelta(days=2)),
+        ])
+
+    assert [day['absent'] for day in coverage['days']] == [1, 1, 1, 0, 0, 0, 0]
+    assert coverage['days'][0]['present'] == EMPLOYEES_PER_DEPARTMENT - 1
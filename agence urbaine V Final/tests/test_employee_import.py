@@ -0,0 +1,42 @@
+import io
+import pytest
+from app import db
+from app.models import Employee, User
+from app.routes.employee import EmployeeForm
+from app.services.employee_import import EmployeeImportService
+
+HEADER = 'first_name,last_name,email,date_of_birth,gender,department,position,annual_leave_days,role,password\n'
+
+def csv_file(*emails):
+    lines = [f'Import,Test,{email},1990-01-01,F,Service 1,Agent,22,employee,secret1\n' for email in emails]
+    return io.BytesIO((HEADER + ''.join(lines)).encode())
+
+@pytest.fixture
+def importer(app):
+    with app.app_context():
+        yield EmployeeImportService(EmployeeForm)
+        imported = db.session.query(User.id).filter(User.email.like('%@import.example.com'))
+        Employee.query.filter(Employee.user_id.in_(imported)).delete(synchronize_session=False)
+        User.query.filter(User.email.like('%@import.example.com')).delete(synchronize_session=False)
+        db.session.commit()
+
+def test_existing_email_is_matched_regardless_of_case(importer):
+    db.session.add(User(email='Dupont@Import.Example.com', username='dupont.existant', role='employee'))
+    db.session.commit()
+
+    result = importer.import_file(csv_file('dupont@import.example.com', 'martin@import.example.com'), 'employes.csv')
+
+    assert result['created'] == 1
+    assert result['errors'] == [(2, ['Un utilisateur avec cet email ou cet identifiant existe déjà'])]
+
+def test_rows_inserted_concurrently_are_reported_instead_of_failing(importer, monkeypatch):
+    db.session.add(User(email='durand@import.example.com', username='durand', role='employee'))
+    db.session.commit()
+    # La vérification passe, puis une autre transaction a déjà créé l'utilisateur
+    monkeypatch.setattr(importer, 'taken_keys', lambda emails, usernames: (set(), set()))
+
+    result = importer.import_file(csv_file('bernard@import.example.com', 'durand@import.example.com'), 'employes.csv')
+
+    assert result['created'] == 1
+    assert result['errors'] == [(3, ['Un utilisateur avec cet email ou cet identifiant existe déjà'])]
+    assert db.session.query(User).filter_by(email='bernard@import.example.com').count() == 1
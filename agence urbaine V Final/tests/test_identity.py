@@ -0,0 +1,72 @@
+import pytest
+from app import db
+from app.models import Employee, User
+from app.services import identity
+from app.services.identity import IdentityCache, identity_cache
+
+def test_invalidate_evicts_changes_older_than_the_ttl(app, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(identity.time, 'time', lambda: clock[0])
+    monkeypatch.setitem(app.config, 'IDENTITY_CACHE_TTL', 60)
+    cache = IdentityCache()
+    with app.test_request_context():
+        cache.invalidate(1)
+        clock[0] += 30
+        cache.invalidate(2)
+        clock[0] += 40
+        cache.invalidate(3)
+        assert list(cache._changed_at) == [2, 3]
+        clock[0] += 10
+        cache.invalidate(2)
+        assert list(cache._changed_at) == [3, 2]
+
+@pytest.fixture
+def employee_user(app):
+    with app.app_context():
+        user = User.query.filter_by(username='e2-7').one()
+        user_id, employee_id = user.id, user.employee.id
+    yield user_id, employee_id
+    with app.app_context():
+        user = db.session.get(User, user_id)
+        user.email, user.role = 'e2-7@example.com', 'employee'
+        db.session.commit()
+
+def test_identity_is_loaded_in_one_query_then_served_from_the_session(app, employee_user, count_queries, monkeypatch):
+    monkeypatch.setitem(app.config, 'IDENTITY_CACHE_TTL', 60)
+    user_id, employee_id = employee_user
+    with app.test_request_context():
+        with count_queries() as queries:
+            user = identity_cache.load(user_id)
+            assert (user.employee.id, user.employee.department.name) == (employee_id, 'Service 2')
+        assert len(queries) == 1
+        assert 'JOIN' in queries[0]
+
+        db.session.expunge_all()
+        with count_queries() as queries:
+            cached = identity_cache.load(user_id)
+            assert (cached.id, cached.role, cached.employee.id) == (user_id, 'employee', employee_id)
+        assert queries == []
+
+def test_account_update_invalidates_the_cached_identity(app, admin_client, employee_user, monkeypatch):
+    monkeypatch.setitem(app.config, 'IDENTITY_CACHE_TTL', 60)
+    user_id, employee_id = employee_user
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+    assert 'e2-7@example.com' in client.get('/profile/').get_data(as_text=True)
+    with client.session_transaction() as session:
+        assert session[IdentityCache.SESSION_KEY]['role'] == 'employee'
+
+    with app.app_context():
+        employee = db.session.get(Employee, employee_id)
+        form = {'first_name': employee.first_name, 'last_name': employee.last_name,
+                'email': 'e2-7.chef@example.com', 'date_of_birth': employee.date_of_birth.isoformat(),
+                'gender': employee.gender, 'department_id': employee.department_id,
+                'position': employee.position, 'annual_leave_days': employee.annual_leave_days,
+                'role': 'manager'}
+    assert admin_client.post(f'/employees/{employee_id}/edit', data=form).status_code == 302
+
+    assert 'e2-7.chef@example.com' in client.get('/profile/').get_data(as_text=True)
+    with client.session_transaction() as session:
+        assert session[IdentityCache.SESSION_KEY]['role'] == 'manager'
@@ -0,0 +1,13 @@
+from app import db
+from app.models import Department
+from tests.conftest import EMPLOYEES_PER_DEPARTMENT
+
+def test_calendar_of_a_department(app, admin_client):
+    with app.app_context():
+        department_id = db.session.query(Department.id).filter(Department.name == 'Service 1').scalar()
+    grid = admin_client.get(f'/leaves/calendar?department_id={department_id}&format=json').get_json()
+    assert len(grid['employees']) == EMPLOYEES_PER_DEPARTMENT
+
+def test_calendar_of_an_unknown_department_is_not_found(admin_client):
+    assert admin_client.get('/leaves/calendar?department_id=999999').status_code == 404
+    assert admin_client.get('/leaves/calendar?department_id=999999&format=json').status_code == 404
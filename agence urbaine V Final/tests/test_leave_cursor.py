@@ -0,0 +1,16 @@
+from datetime import datetime
+from types import SimpleNamespace
+import pytest
+from app.routes.leave import decode_cursor, encode_cursor
+
+@pytest.mark.parametrize('created_at', [
+    datetime(2026, 3, 2, 8, 30),
+    datetime(2026, 3, 2, 8, 30, 15, 123456),
+])
+def test_cursor_round_trip(created_at):
+    leave = SimpleNamespace(created_at=created_at, id=42)
+    assert decode_cursor(encode_cursor(leave)) == (created_at, 42)
+
+@pytest.mark.parametrize('cursor', [None, '', 'abc', '2026-03-02T08:30:00', '2026-13-02T08:30:00_4', '2026-03-02T08:30:00_x'])
+def test_invalid_cursor_is_ignored(cursor):
+    assert decode_cursor(cursor) is None
@@ -0,0 +1,22 @@
+from datetime import date, timedelta
+from app import db
+from app.models import Employee, Leave
+from app.services.leave_index import LeaveIntervalIndex
+
+def test_refresh_drops_leaves_deleted_outside_the_session(app):
+    start = date.today() + timedelta(days=300)
+    end = start + timedelta(days=4)
+    with app.app_context():
+        employee_id = db.session.query(Employee.id).order_by(Employee.id.desc()).limit(1).scalar()
+        leave = Leave(employee_id=employee_id, start_date=start, end_date=end,
+                      leave_type='vacation', status='approved')
+        db.session.add(leave)
+        db.session.commit()
+        index = LeaveIntervalIndex()
+        assert [row[0] for row in index.overlapping(employee_id, start, end)] == [leave.id]
+
+        # Suppression en masse, comme dans un autre processus : aucun événement de session
+        Leave.query.filter_by(id=leave.id).delete()
+        db.session.commit()
+        index._last_refresh = 0.0
+        assert index.overlapping(employee_id, start, end) == []
@@ -0,0 +1,23 @@
+from app import db
+from app.models import Employee, LeaveLedger
+
+def test_get_or_create_rereads_a_row_inserted_concurrently(app, monkeypatch):
+    with app.app_context():
+        employee_id = db.session.query(Employee.id).order_by(Employee.id).limit(1).scalar()
+        key = (employee_id, 2099, 'vacation')
+        get = db.session.get
+
+        def racing_get(model, ident, **kwargs):
+            # Une autre transaction crée la ligne juste après notre lecture
+            monkeypatch.setattr(db.session, 'get', get)
+            db.session.execute(LeaveLedger.__table__.insert().values(
+                employee_id=employee_id, year=2099, leave_type='vacation', days_taken=3, days_pending=0))
+            return None
+
+        monkeypatch.setattr(db.session, 'get', racing_get)
+        try:
+            entry = LeaveLedger.get_or_create(*key)
+            assert (entry.employee_id, entry.year, entry.days_taken) == (employee_id, 2099, 3)
+            assert db.session.query(LeaveLedger).filter_by(year=2099).count() == 1
+        finally:
+            db.session.rollback()
@@ -0,0 +1,26 @@
+from app.services.login_throttle import MemoryThrottleBackend, _roll
+
+def test_roll_keeps_counts_of_the_same_window():
+    assert _roll(10, 10, 3, 4) == (3, 4)
+
+def test_roll_shifts_the_previous_window():
+    assert _roll(11, 10, 3, 4) == (4, 0)
+
+def test_roll_forgets_older_windows():
+    assert _roll(12, 10, 3, 4) == (0, 0)
+
+def test_memory_backend_hits_and_reset():
+    backend = MemoryThrottleBackend()
+    backend.hit('email:a@example.com', 10)
+    backend.hit('email:a@example.com', 10)
+    backend.hit('email:a@example.com', 11)
+    assert backend.counts('email:a@example.com', 11) == (2, 1)
+    backend.reset('email:a@example.com')
+    assert backend.counts('email:a@example.com', 11) == (0, 0)
+
+def test_memory_backend_evicts_least_recently_used_keys():
+    backend = MemoryThrottleBackend(max_keys=2)
+    for key in ('ip:1', 'ip:2', 'ip:1', 'ip:3'):
+        backend.hit(key, 10)
+    assert backend.counts('ip:2', 10) == (0, 0)
+    assert backend.counts('ip:1', 10) == (0, 2)
@@ -0,0 +1,40 @@
+import json
+from app.services.metrics import MetricsRegistry
+
+DEAD_PID = 2 ** 22 + 1  # au-delà de pid_max : aucun processus
+
+def registry_in(directory):
+    registry = MetricsRegistry()
+    registry.directory = str(directory)
+    counter = registry.counter('logins_total', 'Connexions', ('result',))
+    histogram = registry.histogram('render_seconds', 'Rendu', buckets=(0.1, 1))
+    gauge = registry.gauge('pool_checked_out', 'Connexions empruntées')
+    return registry, counter, histogram, gauge
+
+def write_dead_process(directory, registry, counter, histogram, gauge):
+    counter.inc(3, result='ok')
+    histogram.observe(0.5)
+    gauge.set(7)
+    data = registry.snapshot(None)
+    data['pid'] = DEAD_PID
+    (directory / f'metrics_{DEAD_PID}.json').write_text(json.dumps(data), encoding='utf-8')
+
+def test_dead_process_files_are_folded_without_changing_totals(app, tmp_path):
+    write_dead_process(tmp_path, *registry_in(tmp_path))
+    registry, counter, histogram, _ = registry_in(tmp_path)
+    counter.inc(result='ok')
+    histogram.observe(0.05)
+
+    first = registry.render(app)
+    assert not (tmp_path / f'metrics_{DEAD_PID}.json').exists()
+    assert 'logins_total{result="ok"} 4' in first
+    assert 'render_seconds_count 2' in first
+    assert 'render_seconds_bucket{le="0.1"} 1' in first
+    assert 'pool_checked_out{pid="%d"}' % DEAD_PID not in first
+
+    # Un second processus arrêté s'ajoute à l'agrégat existant
+    write_dead_process(tmp_path, *registry_in(tmp_path))
+    second = registry.render(app)
+    assert 'logins_total{result="ok"} 7' in second
+    assert 'render_seconds_count 3' in second
+    assert registry.render(app) == second
@@ -0,0 +1,66 @@
+from datetime import date, datetime
+import pytest
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from flask_migrate import downgrade, upgrade
+from sqlalchemy import inspect, text
+from app import create_app, db
+from app.models import Leave
+from app.services.schema import upgrade_schema
+from config.config import TestingConfig, config
+
+@pytest.fixture
+def file_app(tmp_path, monkeypatch):
+    """Application sur une base SQLite fichier vide, sans création automatique du schéma"""
+    class MigrationConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path / "migrations.db"}'
+        SCHEMA_AUTO_CREATE = False
+    monkeypatch.setitem(config, 'migrations', MigrationConfig)
+    app = create_app('migrations')
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+def test_migrations_match_the_models(file_app):
+    upgrade()
+    with db.engine.connect() as connection:
+        differences = compare_metadata(MigrationContext.configure(connection), db.metadata)
+    assert differences == []
+
+def test_migrations_downgrade_to_nothing(file_app):
+    upgrade()
+    downgrade(revision='base')
+    assert set(inspect(db.engine).get_table_names()) == {'alembic_version'}
+
+def test_pre_migration_database_is_upgraded(file_app):
+    # Base créée par db.create_all() avant les migrations : schéma initial, sans alembic_version
+    upgrade(revision='0001')
+    db.session.execute(text("INSERT INTO users (id, email, username, password_hash, role) "
+                            "VALUES (1, 'a@example.com', 'a', 'secret', 'employee')"))
+    db.session.execute(text("INSERT INTO employees (id, user_id, first_name, last_name, date_of_birth, gender, "
+                            "hire_date, position, annual_leave_days) "
+                            "VALUES (1, 1, 'A', 'B', '1990-01-01', 'F', '2020-01-01', 'Technicienne', 22)"))
+    db.session.execute(text("INSERT INTO leaves (employee_id, start_date, end_date, leave_type, status) VALUES "
+                            "(1, '2026-03-02', '2026-03-08', 'vacation', 'approved'), "
+                            "(1, '2026-04-06', '2026-04-07', 'vacation', 'pending'), "
+                            "(1, '2026-05-04', '2026-05-05', 'vacation', 'rejected')"))
+    db.session.execute(text('DROP TABLE alembic_version'))
+    db.session.commit()
+
+    assert upgrade_schema() == 'migration'
+
+    inspector = inspect(db.engine)
+    assert 'ix_leaves_employee_status_start' in {index['name'] for index in inspector.get_indexes('leaves')}
+    assert {'report_jobs', 'login_throttle'} <= set(inspector.get_table_names())
+    ledger = db.session.execute(text('SELECT year, leave_type, days_taken, days_pending FROM leave_ledger')).all()
+    assert ledger == [(2026, 'vacation', 5, 2)]
+    assert all(isinstance(created_at, datetime) for created_at, in db.session.query(Leave.created_at))
+
+def test_fresh_database_is_created_and_stamped(file_app):
+    assert upgrade_schema() == 'création'
+    version = db.session.execute(text('SELECT version_num FROM alembic_version')).scalar()
+    head = ScriptDirectory.from_config(file_app.extensions['migrate'].migrate.get_config()).get_current_head()
+    assert version == head
+    assert upgrade_schema() == 'migration'
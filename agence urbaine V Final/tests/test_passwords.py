@@ -0,0 +1,14 @@
+import pytest
+from app.models import User
+from app.models import user as user_module
+from app.services.passwords import password_hasher
+
+@pytest.mark.parametrize('capacity, rehashed', [(None, True), (255, True), (128, False)])
+def test_check_password_rehashes_only_if_the_column_fits(app, monkeypatch, capacity, rehashed):
+    monkeypatch.setattr(user_module, 'password_hash_capacity', lambda: capacity)
+    with app.app_context():
+        user = User(email='legacy@example.com', username='legacy', password_hash='ancien-secret')
+        assert user.check_password('ancien-secret')
+        assert password_hasher.is_hashed(user.password_hash) is rehashed
+        assert user.check_password('ancien-secret')
+        assert not user.check_password('mauvais')
@@ -0,0 +1,57 @@
+from datetime import date, timedelta
+import pytest
+from app import db
+from app.models import Employee, Leave
+from app.services import pdf_export
+from app.services.pdf_export import pdf_export_service
+
+@pytest.mark.parametrize('window_functions', [True, False])
+def test_recent_leaves_by_employee(app, monkeypatch, window_functions):
+    monkeypatch.setattr(pdf_export, 'supports_window_functions', lambda bind: window_functions)
+    with app.app_context():
+        employee_id = db.session.query(Employee.id).order_by(Employee.id.desc()).first()[0]
+        start = date(2025, 1, 6)
+        added = [Leave(employee_id=employee_id, leave_type='vacation', status='approved',
+                       start_date=start + timedelta(days=7 * week), end_date=start + timedelta(days=7 * week + 1))
+                 for week in range(4)]
+        # Même date de début que le plus récent : départagé par l'identifiant
+        added.append(Leave(employee_id=employee_id, leave_type='personal', status='approved',
+                           start_date=added[-1].start_date, end_date=added[-1].end_date))
+        db.session.add_all(added)
+        db.session.commit()
+        try:
+            recent = pdf_export_service.recent_leaves_by_employee([employee_id, -1], limit=3)
+            expected = db.session.query(Leave.id).filter(
+                Leave.employee_id == employee_id, Leave.status == 'approved'
+            ).order_by(Leave.start_date.desc(), Leave.id.desc()).limit(3).all()
+            assert [leave.id for leave in recent[employee_id]] == [leave_id for leave_id, in expected]
+            assert recent[-1] == []
+        finally:
+            for leave in added:
+                db.session.delete(leave)
+            db.session.commit()
+
+def test_fingerprint_changes_with_the_calendar_settings(app, monkeypatch):
+    with app.app_context():
+        employee = db.session.query(Employee).first()
+        fingerprint = pdf_export_service.employee_report_fingerprint(employee)
+        assert pdf_export_service.employee_report_fingerprint(employee) == fingerprint
+
+        monkeypatch.setitem(app.config, 'WEEKEND_DAYS', (4, 5))
+        weekend_changed = pdf_export_service.employee_report_fingerprint(employee)
+        monkeypatch.setitem(app.config, 'EXTRA_HOLIDAYS', ('2026-03-03',))
+        holiday_added = pdf_export_service.employee_report_fingerprint(employee)
+
+    assert len({fingerprint, weekend_changed, holiday_added}) == 3
+
+def test_fingerprint_changes_with_the_day(app, monkeypatch):
+    class Tomorrow(date):
+        @classmethod
+        def today(cls):
+            return date.today() + timedelta(days=1)
+
+    with app.app_context():
+        employee = db.session.query(Employee).first()
+        fingerprint = pdf_export_service.employee_report_fingerprint(employee)
+        monkeypatch.setattr(pdf_export, 'date', Tomorrow)
+        assert pdf_export_service.employee_report_fingerprint(employee) != fingerprint
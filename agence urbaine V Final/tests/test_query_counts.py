@@ -0,0 +1,19 @@
+import pytest
+
+# Borne indépendante du nombre de lignes affichées : un chargement paresseux
+# par ligne (N+1) la dépasse largement avec les 24 employés de test.
+MAX_QUERIES = 12
+
+@pytest.mark.parametrize('url', [
+    '/dashboard/',
+    '/leaves/',
+    '/leaves/current',
+    '/departments/',
+    '/employees/',
+])
+def test_page_query_count_is_bounded(admin_client, count_queries, url):
+    admin_client.get(url)  # chargement de l'index des congés et des caches
+    with count_queries() as queries:
+        response = admin_client.get(url)
+    assert response.status_code == 200
+    assert len(queries) <= MAX_QUERIES, '\n'.join(queries)
@@ -0,0 +1,92 @@
+import time
+import pytest
+from app import create_app, db
+from app.models import Department, User
+from app.services import read_replica
+from app.services.read_replica import REPLICA_BIND, replica_reads
+from config.config import TestingConfig, config
+
+@pytest.fixture
+def replica_app(tmp_path, monkeypatch):
+    """Base principale et réplica dans deux fichiers SQLite distincts, au contenu différent"""
+    class ReplicaConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{tmp_path / "primary.db"}'
+        SQLALCHEMY_BINDS = {REPLICA_BIND: f'sqlite:///{tmp_path / "replica.db"}'}
+        REPLICA_STICKY_SECONDS = 5
+    monkeypatch.setitem(config, 'replica', ReplicaConfig)
+    monkeypatch.setattr(read_replica, 'stickiness', read_replica.ReplicaStickiness())
+    app = create_app('replica')
+    with app.app_context():
+        replica = db.engines[REPLICA_BIND]
+        db.metadata.create_all(replica)
+        with replica.begin() as connection:
+            connection.execute(Department.__table__.insert(), [{'name': 'Réplica'}])
+        db.session.add(Department(name='Principale'))
+        db.session.commit()
+        db.session.remove()
+        read_replica.stickiness._until = 0.0  # le commit ci-dessus a activé la lecture sur la base principale
+        yield app
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+def department_names():
+    return sorted(name for name, in db.session.query(Department.name))
+
+def test_marked_reads_go_to_the_replica(replica_app):
+    with replica_app.app_context():
+        assert department_names() == ['Principale']
+        with replica_reads():
+            assert department_names() == ['Réplica']
+
+def test_marked_view_reads_from_the_replica(replica_app):
+    client = replica_app.test_client()
+    with replica_app.app_context():
+        admin = User(email='admin@example.com', username='admin', role='admin')
+        db.session.add(admin)
+        db.session.commit()
+        read_replica.stickiness._until = 0.0
+        user_id = admin.id
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+    page = client.get('/departments/').get_data(as_text=True)
+    assert 'Réplica' in page
+    assert 'Principale' not in page
+
+def test_writes_and_reads_after_a_flush_use_the_primary(replica_app):
+    with replica_app.app_context():
+        with replica_reads():
+            db.session.add(Department(name='Nouveau'))
+            db.session.flush()
+            assert department_names() == ['Nouveau', 'Principale']
+            db.session.commit()
+        primary = db.session.execute(db.text('SELECT name FROM departments ORDER BY name')).scalars().all()
+        assert primary == ['Nouveau', 'Principale']
+        with db.engines[REPLICA_BIND].connect() as connection:
+            assert connection.execute(db.text('SELECT name FROM departments')).scalars().all() == ['Réplica']
+
+def test_reads_stick_to_the_primary_after_a_commit(replica_app, monkeypatch):
+    with replica_app.app_context():
+        db.session.add(Department(name='Nouveau'))
+        db.session.commit()
+        with replica_reads():
+            assert department_names() == ['Nouveau', 'Principale']
+
+        # Au-delà de REPLICA_STICKY_SECONDS, les lectures repartent vers le réplica
+        later = time.time() + replica_app.config['REPLICA_STICKY_SECONDS'] + 1
+        monkeypatch.setattr(read_replica.time, 'time', lambda: later)
+        with replica_reads():
+            assert department_names() == ['Réplica']
+
+def test_user_sticks_to_the_primary_after_writing(replica_app):
+    with replica_app.test_request_context():
+        db.session.add(Department(name='Nouveau'))
+        db.session.commit()
+        read_replica.stickiness._until = 0.0  # seul reste le cookie de l'utilisateur
+        assert read_replica.user_session[read_replica.STICKY_KEY] > time.time()
+        with replica_reads():
+            assert department_names() == ['Nouveau', 'Principale']
+    with replica_app.test_request_context():
+        with replica_reads():
+            assert department_names() == ['Réplica']
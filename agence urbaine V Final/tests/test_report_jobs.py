@@ -0,0 +1,46 @@
+import os
+import socket
+from datetime import datetime, timedelta
+from app import db
+from app.models import ReportJob, User
+from app.services.report_jobs import ReportJobService, report_jobs
+
+def test_orphaned_jobs_fail_and_expired_jobs_are_purged(app, tmp_path):
+    expired_file = tmp_path / 'expired.pdf'
+    expired_file.write_bytes(b'%PDF')
+    long_ago = datetime.utcnow() - timedelta(hours=app.config['REPORT_JOB_RETENTION_HOURS'] + 1)
+    with app.app_context():
+        user_id = db.session.query(User.id).first()[0]
+        jobs = {
+            'orphaned': ReportJob(kind='all_employees_pdf', user_id=user_id, status='running',
+                                  host=socket.gethostname(), pid=2 ** 22 + 1),
+            'current': ReportJob(kind='all_employees_pdf', user_id=user_id, status='pending',
+                                 host=socket.gethostname(), pid=os.getpid()),
+            'other_host': ReportJob(kind='all_employees_pdf', user_id=user_id, status='running',
+                                    host='autre-serveur', pid=2 ** 22 + 1),
+            'expired': ReportJob(kind='all_employees_pdf', user_id=user_id, status='done',
+                                 file_path=str(expired_file), finished_at=long_ago),
+            'recent': ReportJob(kind='all_employees_pdf', user_id=user_id, status='done',
+                                finished_at=datetime.utcnow()),
+        }
+        db.session.add_all(jobs.values())
+        db.session.commit()
+        ids = {name: job.id for name, job in jobs.items()}
+
+        assert report_jobs.maintain(app) == (1, 1)
+
+        statuses = dict(db.session.query(ReportJob.id, ReportJob.status).filter(ReportJob.id.in_(ids.values())))
+        db.session.query(ReportJob).filter(ReportJob.id.in_(ids.values())).delete(synchronize_session=False)
+        db.session.commit()
+
+    assert statuses == {ids['orphaned']: 'failed', ids['current']: 'pending',
+                        ids['other_host']: 'running', ids['recent']: 'done'}
+    assert not expired_file.exists()
+
+def test_maintenance_runs_once_per_process(app, monkeypatch):
+    service = ReportJobService()
+    calls = []
+    monkeypatch.setattr(service, 'maintain', lambda app: calls.append(app))
+    service.ensure_maintained(app)
+    service.ensure_maintained(app)
+    assert calls == [app]
@@ -0,0 +1,33 @@
+import io
+from datetime import date
+import pytest
+from app.services.tabular_export import neutralize, tabular_export_service
+
+@pytest.mark.parametrize('value, expected', [
+    ('=HYPERLINK("http://exemple")', '\'=HYPERLINK("http://exemple")'),
+    ('+212600000000', "'+212600000000"),
+    ('-1+1', "'-1+1"),
+    ('@SUM(A1)', "'@SUM(A1)"),
+    ('\t=1', "'\t=1"),
+    ('Dupont', 'Dupont'),
+    ('', ''),
+    (-3, -3),
+    (None, None),
+    (date(2026, 3, 2), date(2026, 3, 2)),
+])
+def test_neutralize(value, expected):
+    assert neutralize(value) == expected
+
+def test_csv_neutralizes_formulas():
+    content = b''.join(tabular_export_service.iter_csv(['Nom', 'Jours'], [('=1+1', -2)])).decode('utf-8-sig')
+    assert content.splitlines() == ['Nom;Jours', "'=1+1;-2"]
+
+def test_xlsx_neutralizes_formulas():
+    openpyxl = pytest.importorskip('openpyxl')
+    output = io.BytesIO()
+    tabular_export_service.write_xlsx(['Nom', 'Jours'], [('=1+1', -2)], output)
+    output.seek(0)
+    sheet = openpyxl.load_workbook(output).active
+    assert sheet['A2'].value == "'=1+1"
+    assert sheet['A2'].data_type == 's'
+    assert sheet['B2'].value == -2